@@ -0,0 +1,100 @@
+# import the required modules
+import os  # for the number of worker processes
+from concurrent.futures import ProcessPoolExecutor  # for one process per terminal
+import pandas as pd  # for merging the results of the accounts
+from mt import MT5
+from backend import LiveBackend, ReplayBackend
+from report import Report
+from cache import get_account_key
+
+
+def create_terminal_backend(terminal):
+    # a terminal is the path of a terminal executable or of a recording
+    if terminal.endswith((".json", ".json.gz")):
+        return ReplayBackend(terminal)
+    return LiveBackend(terminal)
+
+
+def aggregate_account(
+    terminal, saved_data, start_datetime, end_datetime, use_cache, basis="Deals"
+):
+    # runs in a worker process, the MetaTrader5 module holds one connection per process
+    backend = create_terminal_backend(terminal)
+    # replayed deals are not mixed into the deals cache
+    mt5 = MT5(backend, use_cache=use_cache and not isinstance(backend, ReplayBackend))
+    try:
+        account_info = mt5.backend.account_info()
+        if account_info == None:
+            return terminal, None
+        account = get_account_key(account_info.login, account_info.server)
+        aggregate = Report(mt5, basis=basis).get_aggregate(
+            saved_data, start_datetime, end_datetime
+        )
+        if aggregate is None:
+            return account, None
+        summary = aggregate.magics.copy()
+        summary.insert(
+            0,
+            "label",
+            [mt5.get_magic_label(saved_data, m) for m in summary.index],
+        )
+        return account, (summary, aggregate.buckets)
+    finally:
+        mt5.shutdown()
+
+
+# define a class for aggregating the deals of many terminals side by side
+class AccountsAggregate:
+    def __init__(
+        self, terminals, saved_data, use_cache=True, max_workers=None, basis="Deals"
+    ):
+        self.terminals = terminals  # the terminal executables or recordings
+        self.saved_data = saved_data  # the aliases, goals and states of the magics
+        self.use_cache = use_cache  # whether the workers use the deals cache
+        self.basis = basis  # whether the deals or the round-trip trades are counted
+        # one process per terminal, as long as there are processors for them
+        self.max_workers = max_workers or min(len(terminals), os.cpu_count() or 1)
+
+    def run(self, start_datetime, end_datetime):
+        # aggregate every account in its own process, the wall time is about the
+        # one of the slowest account
+        results = {}
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                terminal: executor.submit(
+                    aggregate_account,
+                    terminal,
+                    self.saved_data,
+                    start_datetime,
+                    end_datetime,
+                    self.use_cache,
+                    self.basis,
+                )
+                for terminal in self.terminals
+            }
+            for terminal, future in futures.items():
+                try:
+                    account, result = future.result()
+                except Exception as e:
+                    print("aggregating {} failed: {}".format(terminal, e))
+                    continue
+                if result is None:
+                    print("No deals found for", account)
+                    continue
+                results[account] = result
+        return self.merge(results)
+
+    def merge(self, results):
+        # put the per-magic results of every account in one table indexed by
+        # account and magic number
+        if not results:
+            return None, None
+        summary = pd.concat(
+            {account: result[0] for account, result in results.items()},
+            names=["account"],
+        )
+        daily = pd.concat(
+            {account: result[1] for account, result in results.items()},
+            names=["account"],
+        )
+        return summary, daily
@@ -0,0 +1,67 @@
+# import the required modules
+from positions import POSITION_TOTALS, empty_positions, summarize_positions
+from metrics import METRIC_COLUMNS, PerformanceMetrics, empty_curve
+
+# the statistics shown in every tab, in the order of the tabs
+TABS_LIST = [
+    "Sum Profit",
+    "Mean Profit",
+    "Reached Profit Goal",
+    "Profit with Goal Status",
+    "Equity",
+    "Drawdown",
+]
+
+
+# define a class holding everything the plots and the treeview show after a refresh
+class AggregateResult:
+    def __init__(
+        self,
+        tabs_list,
+        buckets,
+        daily=None,
+        positions=None,
+        metrics=None,
+        curve=None,
+    ):
+        if daily is None:
+            daily = buckets
+        # the sum, count, mean and goal status of each time and magic number
+        self.buckets = buckets.assign(mean=buckets["sum"] / buckets["count"])
+        # the equity of the trades and how far it fell below its highest point, from
+        # the same trades as the maximum drawdown of the metrics
+        if curve is None:
+            curve = empty_curve()
+        self.buckets = self.buckets.join(curve)
+        # the series shown in each tab
+        self.plot_data = [
+            (0, tabs_list[0], self.buckets["sum"].rename("profit")),
+            (1, tabs_list[1], self.buckets["mean"].rename("profit")),
+            # add a third plot for the profit goal
+            (2, tabs_list[2], self.buckets["reached_goal"].rename("profit")),
+            (3, tabs_list[3], self.buckets["goal_status"].rename("profit")),
+            (4, tabs_list[4], curve["equity"].rename("profit")),
+            (5, tabs_list[5], (-curve["drawdown"]).rename("profit")),
+        ]
+        # the totals of each magic number in one pass over the daily aggregates
+        self.magics = (
+            daily.assign(mean=daily["sum"] / daily["count"])
+            .groupby(level="magic")
+            .agg(total_profit=("sum", "sum"), mean_profit=("mean", "mean"))
+        )
+        self.set_positions(positions)
+        # the performance metrics of every magic number, empty when there are none
+        if metrics is None:
+            metrics = PerformanceMetrics().get_table()
+        metrics = metrics.reindex(self.magics.index)
+        metrics["trades"] = metrics["trades"].fillna(0).astype("int64")
+        for column in METRIC_COLUMNS:
+            self.magics[column] = metrics[column].to_numpy()
+
+    def set_positions(self, positions):
+        # the totals of the open positions looked up by the magic number index
+        if positions is None:
+            positions = summarize_positions(empty_positions())
+        positions = positions.reindex(self.magics.index, fill_value=0)
+        for column in POSITION_TOTALS:
+            self.magics[column] = positions[column].to_numpy()
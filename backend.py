@@ -0,0 +1,206 @@
+# import the required modules
+import gzip  # for compressing the recordings
+import json  # for storing the recordings
+import time  # for the replay clock
+from collections import namedtuple  # for rebuilding the terminal records
+import numpy as np  # for searching the replayed deals by time
+from cache import to_timestamp
+
+
+# define the interface every data source of the MT5 class implements
+class Backend:
+    def initialize(self):
+        raise NotImplementedError
+
+    def shutdown(self):
+        raise NotImplementedError
+
+    def last_error(self):
+        raise NotImplementedError
+
+    def account_info(self):
+        raise NotImplementedError
+
+    def terminal_info(self):
+        raise NotImplementedError
+
+    def history_deals_get(self, date_from, date_to):
+        raise NotImplementedError
+
+    def positions_get(self):
+        raise NotImplementedError
+
+
+# define a backend that talks to a running MetaTrader 5 terminal
+class LiveBackend(Backend):
+    def __init__(self, path=None):
+        # the MetaTrader5 module is only available on Windows, so import it here
+        import MetaTrader5
+
+        self.mt5 = MetaTrader5
+        self.path = path  # the path of the terminal executable, if not the default
+
+    def initialize(self):
+        if self.path:
+            return self.mt5.initialize(self.path)
+        return self.mt5.initialize()
+
+    def shutdown(self):
+        return self.mt5.shutdown()
+
+    def last_error(self):
+        return self.mt5.last_error()
+
+    def account_info(self):
+        return self.mt5.account_info()
+
+    def terminal_info(self):
+        return self.mt5.terminal_info()
+
+    def history_deals_get(self, date_from, date_to):
+        return self.mt5.history_deals_get(date_from, date_to)
+
+    def positions_get(self):
+        return self.mt5.positions_get()
+
+
+def open_recording(path, mode):
+    # recordings ending in .gz are compressed
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+# define a backend that records everything another backend returns to a file
+class RecordingBackend(Backend):
+    def __init__(self, backend, path):
+        self.backend = backend  # the backend being recorded
+        self.path = path  # the file the recording is written to
+        self.deal_fields = None
+        self.deals = {}  # the recorded deals by ticket
+        self.position_fields = None
+        self.positions = []  # the last recorded positions snapshot
+        self.account = None
+        self.terminal = None
+
+    def initialize(self):
+        return self.backend.initialize()
+
+    def shutdown(self):
+        # write the recording when the connection is closed
+        self.save()
+        return self.backend.shutdown()
+
+    def last_error(self):
+        return self.backend.last_error()
+
+    def account_info(self):
+        account_info = self.backend.account_info()
+        if account_info != None:
+            self.account = account_info._asdict()
+        return account_info
+
+    def terminal_info(self):
+        terminal_info = self.backend.terminal_info()
+        if terminal_info != None:
+            self.terminal = terminal_info._asdict()
+        return terminal_info
+
+    def history_deals_get(self, date_from, date_to):
+        deals = self.backend.history_deals_get(date_from, date_to)
+        if deals:
+            self.deal_fields = list(deals[0]._fields)
+            for deal in deals:
+                self.deals[deal.ticket] = list(deal)
+        return deals
+
+    def positions_get(self):
+        positions = self.backend.positions_get()
+        if positions != None:
+            self.positions = [list(position) for position in positions]
+            if positions:
+                self.position_fields = list(positions[0]._fields)
+        return positions
+
+    def save(self):
+        # store the deals ordered by ticket together with the terminal state
+        with open_recording(self.path, "w") as f:
+            json.dump(
+                {
+                    "recorded_at": int(time.time()),
+                    "account_info": self.account,
+                    "terminal_info": self.terminal,
+                    "deal_fields": self.deal_fields,
+                    "deals": [self.deals[ticket] for ticket in sorted(self.deals)],
+                    "position_fields": self.position_fields,
+                    "positions": self.positions,
+                },
+                f,
+            )
+
+
+# define a backend that serves a recording back without a terminal
+class ReplayBackend(Backend):
+    def __init__(self, path, speed=0, start=None):
+        with open_recording(path, "r") as f:
+            recording = json.load(f)
+        self.account = recording["account_info"]
+        self.terminal = recording["terminal_info"]
+        # rebuild the deals as the same kind of records the terminal returns
+        self.deals = []
+        if recording["deal_fields"]:
+            TradeDeal = namedtuple("TradeDeal", recording["deal_fields"])
+            self.deals = [TradeDeal(*deal) for deal in recording["deals"]]
+            self.deals.sort(key=lambda deal: (deal.time, deal.ticket))
+        self.times = np.array([deal.time for deal in self.deals], dtype="int64")
+        self.positions = []
+        if recording["position_fields"]:
+            TradePosition = namedtuple("TradePosition", recording["position_fields"])
+            self.positions = [TradePosition(*p) for p in recording["positions"]]
+        # with a speed the replay clock starts at the given time (or the first
+        # deal) and runs speed times faster, so new deals trickle in
+        self.speed = speed
+        if start is None:
+            start = self.times[0] if len(self.times) > 0 else 0
+        self.start = to_timestamp(start)
+        self.started_at = time.monotonic()
+
+    def now(self):
+        # the current time of the replay, or None when everything is visible
+        if not self.speed:
+            return None
+        return self.start + (time.monotonic() - self.started_at) * self.speed
+
+    def initialize(self):
+        return True
+
+    def shutdown(self):
+        return True
+
+    def last_error(self):
+        return (1, "Success")
+
+    def account_info(self):
+        if self.account == None:
+            return None
+        return namedtuple("AccountInfo", self.account)(**self.account)
+
+    def terminal_info(self):
+        if self.terminal == None:
+            return None
+        return namedtuple("TerminalInfo", self.terminal)(**self.terminal)
+
+    def history_deals_get(self, date_from, date_to):
+        date_from, date_to = to_timestamp(date_from), to_timestamp(date_to)
+        now = self.now()
+        if now != None:
+            date_to = min(date_to, int(now))
+        first = np.searchsorted(self.times, date_from, side="left")
+        last = np.searchsorted(self.times, date_to, side="right")
+        return tuple(self.deals[first:last])
+
+    def positions_get(self):
+        now = self.now()
+        if now == None:
+            return tuple(self.positions)
+        return tuple(position for position in self.positions if position.time <= now)
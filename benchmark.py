@@ -0,0 +1,550 @@
+# import the required modules
+import argparse  # for parsing the command line options
+import json  # for the baseline and the results
+import tempfile  # for writing the charts somewhere
+import time  # for timing the stages
+import tracemalloc  # for the peak memory of the stages
+from collections import namedtuple  # for the records the terminal returns
+import numpy as np  # for generating the deals
+import pandas as pd  # for the reference results of the checks
+from mt import MT5
+from backend import Backend
+from aggregate import AggregateResult, TABS_LIST
+from settings import Settings
+from metrics import METRIC_COLUMNS, PerformanceMetrics, get_trades
+from live import LiveAggregate
+from pyramid import RESOLUTIONS
+from trades import TradeBuilder, build_trades
+from cube import BreakdownCube
+from summary import SummaryTable
+from report import Report
+
+# the fields of the deals returned by the MetaTrader 5 terminal
+TradeDeal = namedtuple(
+    "TradeDeal",
+    "ticket order time time_msc type entry magic position_id reason volume price "
+    "commission swap profit fee symbol comment external_id",
+)
+# the numbers of deals benchmarked by default
+SIZES = [10_000, 1_000_000, 10_000_000]
+# the stages benchmarked, in the order they run in a refresh
+STAGES = [
+    "convert",
+    "filter",
+    "group",
+    "plot_data",
+    "metrics",
+    "cube",
+    "treeview",
+    "plot",
+    "charts",
+]
+# how much slower than the baseline a stage may get before it fails
+TOLERANCE = 0.25
+# the number of deals the results of the fast paths are checked on
+CHECK_SIZE = 100_000
+# the number of chunks the incremental paths are fed with in the checks
+CHECK_CHUNKS = 7
+# the settings of the magic numbers: one hidden, like the Edit Filters window
+# does, and one with goals
+SAVED_DATA = {"1000": {"state": 0}, "1001": {"profit": 50, "loss": -50}}
+# the first day of the generated deals (2023-01-01)
+START_TIME = 1672531200
+
+
+def generate_deals(
+    count, magics=20, symbols=8, days=365, seed=0, symbols_per_magic=None
+):
+    # generate deals shaped like the ones of the terminal, opened and closed in pairs
+    # with the profit on the closing deal, spread over the days; every magic number
+    # trades all the symbols, or only a few of them if symbols_per_magic is given
+    rng = np.random.default_rng(seed)
+    positions = max(count // 2, 1)
+    magic_numbers = np.concatenate([[0], 1000 + np.arange(magics - 1)])
+    symbol_names = np.array([f"SYM{i:02d}" for i in range(symbols)])
+    opened = np.sort(rng.integers(START_TIME, START_TIME + days * 86400, positions))
+    closed = opened + rng.integers(1, 3600, positions)
+    magic_codes = rng.integers(0, magics, positions)
+    position_magics = magic_numbers[magic_codes]
+    if symbols_per_magic:
+        # the symbols of every magic number, picked once
+        magic_symbols = np.argsort(rng.random((magics, symbols)), axis=1)
+        magic_symbols = magic_symbols[:, :symbols_per_magic]
+        picks = rng.integers(0, magic_symbols.shape[1], positions)
+        position_symbols = symbol_names[magic_symbols[magic_codes, picks]]
+    else:
+        position_symbols = symbol_names[rng.integers(0, symbols, positions)]
+    # interleave the opening and closing deal of every position, the closing deal
+    # with the volume of the opening one
+    times = np.stack([opened, closed], axis=1).ravel()[:count]
+    entries = np.tile([0, 1], positions)[:count]
+    profits = np.where(entries == 1, rng.normal(0, 10, count).round(2), 0.0)
+    commissions = np.full(count, -0.5)
+    volumes = np.repeat(rng.choice([0.01, 0.1, 0.5, 1.0], positions), 2)[:count]
+    prices = rng.uniform(1, 2000, count).round(5)
+    types = rng.integers(0, 2, count)
+    position_ids = np.repeat(np.arange(positions) + 1, 2)[:count]
+    deal_magics = np.repeat(position_magics, 2)[:count]
+    deal_symbols = np.repeat(position_symbols, 2)[:count]
+    # the terminal numbers the deals in the order they were executed
+    order = np.argsort(times, kind="stable")
+    tickets = np.arange(count) + 1
+    times = times[order]
+    return [
+        TradeDeal(*record)
+        for record in zip(
+            tickets.tolist(),
+            tickets.tolist(),
+            times.tolist(),
+            (times * 1000).tolist(),
+            types[order].tolist(),
+            entries[order].tolist(),
+            deal_magics[order].tolist(),
+            position_ids[order].tolist(),
+            [3] * count,
+            volumes[order].tolist(),
+            prices[order].tolist(),
+            commissions[order].tolist(),
+            [0.0] * count,
+            profits[order].tolist(),
+            [0.0] * count,
+            deal_symbols[order].tolist(),
+            [""] * count,
+            [""] * count,
+        )
+    ]
+
+
+def fold_metrics(deals):
+    metrics = PerformanceMetrics()
+    metrics.fold(deals)
+    return metrics
+
+
+def fold_cube(mt5, deals, magic):
+    # group the deals by day, magic number and symbol and drill down into one magic
+    cube = BreakdownCube(mt5)
+    cube.fold(deals)
+    return cube.get_totals(magic), cube.get_breakdown(magic)
+
+
+def create_plotter(mt5):
+    # a window without Tk: the tabs are drawn by the methods of the GUI on figures
+    # of the Agg backend, downsampled and updated the same way
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from gui import GUI
+
+    plotter = GUI.__new__(GUI)
+    plotter.mt5 = mt5
+    plotter.plots = []
+    for title in TABS_LIST:
+        fig = Figure(figsize=(5, 4), dpi=100)
+        ax = fig.add_subplot(111)
+        ax.set_xlabel("time")
+        plotter.plots.append(
+            {"fig": fig, "canvas": FigureCanvasAgg(fig), "ax": ax, "lines": {}}
+        )
+    return plotter
+
+
+def plot_tabs(plotter, aggregate, labels, colors):
+    # downsample, update and draw every tab, as when all of them are shown
+    for i, title, data in aggregate.plot_data:
+        lines = plotter.get_lines(data)
+        plotter.update_plot(i, title, lines, labels, colors, "Day")
+        plotter.draw_plot(i)
+
+
+def same_frame(result, expected):
+    # equal indexes and columns, and equal values up to the rounding of the sums
+    return (
+        result.index.equals(expected.index)
+        and list(result.columns) == list(expected.columns)
+        and np.allclose(
+            result.to_numpy(dtype="float64"),
+            expected.to_numpy(dtype="float64"),
+            equal_nan=True,
+        )
+    )
+
+
+def reference_goals(saved_data, profit):
+    # the goals of every bucket classified row by row, the way the lambdas of the
+    # first version did
+    def get_goal(magic, field):
+        return float((saved_data.get(str(magic)) or {}).get(field) or 0)
+
+    reached_goal, goal_status = [], []
+    for (time, magic), y in profit.items():
+        profit_goal, loss_goal = get_goal(magic, "profit"), get_goal(magic, "loss")
+        reached_goal.append(1 if y >= profit_goal else -1 if y <= loss_goal else 0)
+        goal_status.append(
+            2
+            if y >= profit_goal
+            else 1
+            if y > 0
+            else 0
+            if y == 0
+            else -2
+            if y <= loss_goal
+            else -1
+        )
+    return reached_goal, goal_status
+
+
+def reference_metrics(deals):
+    # the metrics of every magic number computed at once with pandas, trade by
+    # trade in time order
+    trades = get_trades(deals).sort_values(["magic", "time"], kind="stable")
+    profit = trades["profit"].astype("float64")
+    by_magic = profit.groupby(trades["magic"])
+    equity = by_magic.cumsum()
+    peak = equity.groupby(trades["magic"]).cummax().clip(lower=0)
+    wins = profit.where(profit > 0)
+    losses = profit.where(profit < 0)
+    table = pd.DataFrame(
+        {
+            "trades": by_magic.count(),
+            "win_rate": (profit > 0).groupby(trades["magic"]).mean(),
+            "profit_factor": wins.groupby(trades["magic"]).sum()
+            / -losses.groupby(trades["magic"]).sum(),
+            "avg_win": wins.groupby(trades["magic"]).mean(),
+            "avg_loss": losses.groupby(trades["magic"]).mean(),
+            "max_drawdown": (peak - equity).groupby(trades["magic"]).max(),
+            "sharpe": by_magic.mean() / by_magic.std(),
+        }
+    )
+    table.index.name = "magic"
+    return table.replace([np.inf, -np.inf], np.nan)
+
+
+def split(deals, chunks=CHECK_CHUNKS):
+    # the deals in time order as chunks of about equal size
+    return [deals.iloc[part] for part in np.array_split(np.arange(len(deals)), chunks)]
+
+
+def check_goals(mt5, settings, filtered):
+    # the goal series of get_plot_data against the row by row classification
+    plot_data = mt5.get_plot_data(
+        settings, TABS_LIST, mt5.group_data_by_time_and_magic(filtered.copy())
+    )
+    profit = plot_data[0][2]
+    reached_goal, goal_status = reference_goals(SAVED_DATA, profit)
+    return np.array_equal(plot_data[2][2].to_numpy(), reached_goal) and np.array_equal(
+        plot_data[3][2].to_numpy(), goal_status
+    )
+
+
+def check_polls(records, settings):
+    # the aggregates kept up to date by the polls against grouping every deal again
+    backend = SyntheticBackend(records[: len(records) // CHECK_CHUNKS])
+    mt5 = MT5(backend, use_cache=False)
+    live = LiveAggregate(mt5, settings, mt5.fetch_data(0, 0), None, None)
+    for resolution in RESOLUTIONS:
+        live.pyramid.get(resolution)
+    for end in np.linspace(0, len(records), CHECK_CHUNKS + 1)[2:].astype(int):
+        backend.deals = records[:end]
+        live.poll(0)
+    mt5 = MT5(SyntheticBackend(records), use_cache=False)
+    full = LiveAggregate(mt5, settings, mt5.fetch_data(0, 0), None, None)
+    return all(
+        same_frame(
+            live.pyramid.get(resolution).sort_index(),
+            full.pyramid.get(resolution).sort_index(),
+        )
+        for resolution in RESOLUTIONS
+    ) and same_frame(live.metrics.get_table(), full.metrics.get_table())
+
+
+def check_trades(filtered):
+    # the trades built chunk by chunk against building them from every deal at once
+    builder = TradeBuilder()
+    trades = pd.concat([builder.fold(chunk) for chunk in split(filtered)])
+    expected = build_trades(filtered)[0]
+    columns = ["position_id", "magic", "open_time", "time", "volume", "profit"]
+    return same_frame(
+        trades.sort_values("position_id", ignore_index=True)[columns],
+        expected.sort_values("position_id", ignore_index=True)[columns],
+    )
+
+
+def check_metrics(filtered):
+    # the metrics folded chunk by chunk against the pandas reference, and their
+    # equity curve against the one of a single fold
+    metrics = PerformanceMetrics()
+    for chunk in split(filtered):
+        metrics.fold(chunk)
+    once = PerformanceMetrics()
+    once.fold(filtered)
+    return same_frame(
+        metrics.get_table()[METRIC_COLUMNS], reference_metrics(filtered)
+    ) and all(
+        same_frame(metrics.get_curve(resolution), once.get_curve(resolution))
+        for resolution in RESOLUTIONS
+    )
+
+
+# define a backend that serves the generated deals
+class SyntheticBackend(Backend):
+    def __init__(self, deals):
+        self.deals = deals
+
+    def initialize(self):
+        return True
+
+    def shutdown(self):
+        return True
+
+    def last_error(self):
+        return (1, "Success")
+
+    def account_info(self):
+        return None
+
+    def terminal_info(self):
+        return None
+
+    def history_deals_get(self, date_from, date_to):
+        return self.deals
+
+    def positions_get(self):
+        return ()
+
+
+# define a treeview that only counts the calls, the table is built without Tk
+class CountingTreeview:
+    def __init__(self):
+        self.calls = 0
+
+    def __setitem__(self, key, value):
+        self.calls += 1
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            self.calls += 1
+
+        return call
+
+
+# define a class for timing every stage of a refresh on generated deals
+class Benchmark:
+    def __init__(
+        self,
+        repeat=3,
+        memory=True,
+        magics=20,
+        symbols=8,
+        days=365,
+        symbols_per_magic=None,
+    ):
+        self.repeat = repeat  # the stages are timed this many times, the best counts
+        self.memory = memory  # whether to also measure the peak memory of the stages
+        self.magics, self.symbols, self.days = magics, symbols, days
+        self.symbols_per_magic = symbols_per_magic  # the symbols of every magic
+
+    def measure(self, stage, count):
+        # the best time of the stage and its peak memory, with its last result
+        seconds = float("inf")
+        for i in range(self.repeat):
+            start = time.perf_counter()
+            result = stage()
+            seconds = min(seconds, time.perf_counter() - start)
+        measurement = {"seconds": seconds, "deals_per_second": count / seconds}
+        if self.memory:
+            tracemalloc.start()
+            stage()
+            measurement["peak_memory"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return measurement, result
+
+    def check(self, count):
+        # check that the fast paths give the results of the reference ones
+        records = generate_deals(
+            count,
+            self.magics,
+            self.symbols,
+            self.days,
+            symbols_per_magic=self.symbols_per_magic,
+        )
+        mt5 = MT5(SyntheticBackend(records), use_cache=False)
+        settings = Settings(SAVED_DATA)
+        filtered = mt5.get_filtered_deals(
+            settings, mt5.convert_data_to_dataframe(records)
+        )
+        return {
+            "goals": check_goals(mt5, settings, filtered),
+            "polls": check_polls(records, settings),
+            "trades": check_trades(filtered),
+            "metrics": check_metrics(filtered),
+        }
+
+    def run(self, count):
+        records = generate_deals(
+            count,
+            self.magics,
+            self.symbols,
+            self.days,
+            symbols_per_magic=self.symbols_per_magic,
+        )
+        mt5 = MT5(SyntheticBackend(records), use_cache=False)
+        settings = Settings(SAVED_DATA)
+        results = {}
+        results["convert"], deals = self.measure(
+            lambda: mt5.convert_data_to_dataframe(records), count
+        )
+        results["filter"], filtered = self.measure(
+            lambda: mt5.get_filtered_deals(settings, deals), count
+        )
+        # grouping converts the time column in place, so it works on a copy
+        results["group"], grouped = self.measure(
+            lambda: mt5.group_data_by_time_and_magic(filtered.copy())["profit"].agg(
+                ["sum", "count"]
+            ),
+            count,
+        )
+        results["plot_data"], plot_data = self.measure(
+            lambda: mt5.get_plot_data(
+                settings,
+                TABS_LIST,
+                mt5.group_data_by_time_and_magic(filtered.copy()),
+            ),
+            count,
+        )
+        results["metrics"], metrics = self.measure(
+            lambda: fold_metrics(filtered), count
+        )
+        # grouping converts the time column in place, so it works on a copy
+        results["cube"], breakdown = self.measure(
+            lambda: fold_cube(mt5, filtered.copy(), 0), count
+        )
+        daily = mt5.aggregate_profit(
+            settings, mt5.group_data_by_time_and_magic(filtered.copy())
+        )
+        aggregate = AggregateResult(
+            TABS_LIST,
+            daily,
+            metrics=metrics.get_table(),
+            curve=metrics.get_curve("Day"),
+        )
+        labels = {m: mt5.get_magic_label(settings, m) for m in aggregate.magics.index}
+        colors = {m: "C0" for m in aggregate.magics.index}
+        results["treeview"], table = self.measure(
+            lambda: SummaryTable(CountingTreeview()).update(aggregate, labels, colors),
+            count,
+        )
+        plotter = create_plotter(mt5)
+        results["plot"], plotted = self.measure(
+            lambda: plot_tabs(plotter, aggregate, labels, colors), count
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            report = Report(mt5)
+            results["charts"], paths = self.measure(
+                lambda: report.write_charts(aggregate, settings, directory), count
+            )
+        return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    # the stages slower than the baseline by more than the tolerance
+    regressions = []
+    for size, stages in results.items():
+        for stage, measurement in stages.items():
+            expected = baseline.get(size, {}).get(stage)
+            if expected is None:
+                continue
+            if measurement["seconds"] > expected["seconds"] * (1 + tolerance):
+                regressions.append((size, stage, expected["seconds"], measurement))
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Expert Statistics benchmark")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=SIZES,
+        help="the numbers of deals to benchmark (10M deals need several GB of memory)",
+    )
+    parser.add_argument("--magics", type=int, default=20)
+    parser.add_argument("--symbols", type=int, default=8)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument(
+        "--symbols-per-magic",
+        type=int,
+        help="let every magic number trade only this many of the symbols",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--no-memory", action="store_true", help="do not measure the peak memory"
+    )
+    parser.add_argument(
+        "--baseline",
+        metavar="FILE",
+        help="fail when a stage is slower than in this baseline",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        metavar="FILE",
+        help="write the results to this file as the new baseline",
+    )
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument(
+        "--check-size",
+        type=int,
+        default=CHECK_SIZE,
+        help="the number of deals the results are checked on, 0 to skip the checks",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    benchmark = Benchmark(
+        args.repeat,
+        not args.no_memory,
+        args.magics,
+        args.symbols,
+        args.days,
+        args.symbols_per_magic,
+    )
+    if args.check_size:
+        # a faster stage must not change the numbers
+        checks = benchmark.check(args.check_size)
+        for name, passed in checks.items():
+            print(f"check {name}: {'ok' if passed else 'FAILED'}")
+        if not all(checks.values()):
+            return 1
+    results = {}
+    print(f"{'deals':>10} {'stage':<10} {'seconds':>9} {'deals/s':>12} {'peak MB':>8}")
+    for count in args.sizes:
+        results[str(count)] = benchmark.run(count)
+        for stage in STAGES:
+            measurement = results[str(count)][stage]
+            peak = "-"
+            if "peak_memory" in measurement:
+                peak = f"{measurement['peak_memory'] / 2**20:.1f}"
+            print(
+                f"{count:>10} {stage:<10} {measurement['seconds']:>9.4f} "
+                f"{measurement['deals_per_second']:>12.0f} {peak:>8}"
+            )
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for size, stage, expected, measurement in regressions:
+            print(
+                f"REGRESSION {size} deals {stage}: {measurement['seconds']:.4f}s "
+                f"(baseline {expected:.4f}s)"
+            )
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
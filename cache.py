@@ -0,0 +1,229 @@
+# import the required modules
+import os  # for working with cache files
+import re
+import json  # for storing the cache metadata
+import calendar  # for converting datetimes to timestamps
+from datetime import date  # for working with dates and times
+import numpy as np  # for storing the columns on disk
+import pandas as pd  # for data manipulation and analysis
+
+
+# the directory where the deal caches are stored
+CACHE_DIR = "cache"
+# the number of chunk files after which the cache is compacted into one
+MAX_CHUNKS = 32
+
+
+def concat(frames):
+    # join the frames keeping the string columns categorical
+    deals = pd.concat(frames, ignore_index=True)
+    for column in deals.columns:
+        if deals[column].dtype == object:
+            deals[column] = deals[column].astype("category")
+    return deals
+
+
+def get_account_key(login, server):
+    # the name of the files of an account, safe as a path on every system
+    return re.sub(r"[^\w.-]", "_", f"{login}_{server}")
+
+
+def index_magics(deals):
+    # get the first and last deal time and the number of deals of every magic number
+    if deals is None or len(deals) == 0:
+        return pd.DataFrame(
+            {"first_time": [], "last_time": [], "count": []},
+            index=pd.Index([], dtype="int64", name="magic"),
+            dtype="int64",
+        )
+    return deals.groupby("magic")["time"].agg(
+        first_time="min", last_time="max", count="count"
+    )
+
+
+def to_timestamp(value):
+    # convert a date or datetime (or a number of seconds since 1970.01.01) to seconds
+    if isinstance(value, date):
+        return calendar.timegm(value.timetuple())
+    return int(value)
+
+
+# define a class for keeping an on-disk columnar copy of the deals history
+class DealCache:
+    def __init__(self, login, server, directory=CACHE_DIR):
+        # the cache directory is keyed by account and server
+        key = get_account_key(login, server)
+        self.path = os.path.join(directory, key)
+        # the cached deals sorted by time, as the parts appended since they were last
+        # joined, so an update never copies the whole history
+        self.parts = []
+        self.start = None  # the earliest time covered by the cache
+        self.last_time = None  # the time of the newest cached deal
+        self.last_ticket = None  # the highest ticket already seen
+        self.chunks = []  # the chunk files holding the cached columns
+        self.next_chunk = 0  # the number of the next chunk file
+        self.magics = index_magics(None)  # the index of the distinct magic numbers
+        self.load()
+
+    def load(self):
+        # read the coverage metadata and the cached column chunks
+        try:
+            with open(os.path.join(self.path, "meta.json"), "r") as f:
+                meta = json.load(f)
+            frames = [self.read_chunk(name) for name in meta["chunks"]]
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            return
+        self.start = meta["start"]
+        self.last_time = meta["last_time"]
+        self.last_ticket = meta["last_ticket"]
+        self.chunks = meta["chunks"]
+        self.next_chunk = meta["next_chunk"]
+        if frames:
+            self.parts = [concat(frames)]
+        if "magics" in meta:
+            self.magics = pd.DataFrame.from_dict(
+                meta["magics"],
+                orient="index",
+                columns=["first_time", "last_time", "count"],
+            )
+            self.magics.index = self.magics.index.astype("int64").rename("magic")
+            self.magics = self.magics.sort_index()
+        else:
+            self.magics = index_magics(self.parts[0] if self.parts else None)
+
+    def read_chunk(self, name):
+        with np.load(os.path.join(self.path, name)) as f:
+            columns = [str(column) for column in f["columns"]]
+            # the string columns are restored as categoricals
+            return pd.DataFrame(
+                {
+                    column: pd.Categorical(f[column])
+                    if f[column].dtype.kind == "U"
+                    else f[column]
+                    for column in columns
+                }
+            )
+
+    def write_chunk(self, deals):
+        # store the columns of a chunk, strings as fixed width unicode arrays
+        name = "chunk_{}.npz".format(self.next_chunk)
+        self.next_chunk += 1
+        arrays = {
+            column: deals[column].to_numpy(
+                dtype=str if deals[column].dtype in (object, "category") else None
+            )
+            for column in deals.columns
+        }
+        np.savez(
+            os.path.join(self.path, name),
+            columns=np.array(deals.columns, dtype=str),
+            **arrays,
+        )
+        return name
+
+    def write_meta(self):
+        # replace the metadata atomically so a crash never leaves it half written
+        meta_path = os.path.join(self.path, "meta.json")
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump(
+                {
+                    "start": self.start,
+                    "last_time": self.last_time,
+                    "last_ticket": self.last_ticket,
+                    "chunks": self.chunks,
+                    "next_chunk": self.next_chunk,
+                    "magics": {
+                        str(magic): [int(value) for value in row]
+                        for magic, row in zip(self.magics.index, self.magics.to_numpy())
+                    },
+                },
+                f,
+            )
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def save(self, new_deals, head=False):
+        # write only the newly fetched deals as a new chunk
+        os.makedirs(self.path, exist_ok=True)
+        old_chunks = []
+        if len(self.chunks) >= MAX_CHUNKS or head:
+            # compact every chunk into one to keep the loading fast and ordered, the
+            # parts in memory are joined at the same time
+            old_chunks, self.chunks = self.chunks, []
+            if self.parts:
+                self.parts = [concat(self.parts)]
+                self.chunks.append(self.write_chunk(self.parts[0]))
+        elif new_deals is not None and len(new_deals) > 0:
+            self.chunks.append(self.write_chunk(new_deals))
+        self.write_meta()
+        for name in old_chunks:
+            os.remove(os.path.join(self.path, name))
+
+    def append(self, deals, head=False):
+        # merge newly fetched deals into the cached ones keeping the time order
+        if deals is None or len(deals) == 0:
+            return None
+        deals = deals.sort_values(["time", "ticket"], kind="stable", ignore_index=True)
+        if head:
+            self.parts.insert(0, deals)
+        else:
+            self.parts.append(deals)
+        self.last_time = int(self.parts[-1]["time"].iat[-1])
+        last_ticket = int(deals["ticket"].max())
+        if self.last_ticket is not None:
+            last_ticket = max(self.last_ticket, last_ticket)
+        self.last_ticket = last_ticket
+        # fold the new deals into the index of the magic numbers
+        self.magics = (
+            pd.concat([self.magics, index_magics(deals)])
+            .groupby(level="magic")
+            .agg({"first_time": "min", "last_time": "max", "count": "sum"})
+        )
+        return deals
+
+    def update(self, fetch, start_datetime, end_datetime):
+        # ask the terminal only for the part of the range the cache does not hold
+        start, end = to_timestamp(start_datetime), to_timestamp(end_datetime)
+        if self.start is None:
+            # the first refresh of this account fetches the whole range
+            deals = self.append(fetch(start, end))
+            self.start = start
+            self.save(deals)
+            return
+        if start < self.start:
+            # fetch the older deals before the covered range
+            deals = fetch(start, self.start)
+            if deals is not None:
+                deals = deals[deals["time"] < self.start]
+            self.append(deals, head=True)
+            self.start = start
+            self.save(deals, head=True)
+        tail_start = self.last_time if self.last_time is not None else self.start
+        if end >= tail_start:
+            # fetch only the tail of new deals since the last refresh
+            deals = fetch(tail_start, end)
+            if deals is not None and self.last_ticket is not None:
+                deals = deals[deals["ticket"] > self.last_ticket]
+            deals = self.append(deals)
+            if deals is not None:
+                self.save(deals)
+
+    def get_range(self, start_datetime, end_datetime):
+        # serve the requested range from the cached deals
+        if not self.parts:
+            return None
+        start, end = to_timestamp(start_datetime), to_timestamp(end_datetime)
+        slices = []
+        for part in self.parts:
+            times = part["time"].to_numpy()
+            first = np.searchsorted(times, start, side="left")
+            last = np.searchsorted(times, end, side="right")
+            if first < last:
+                slices.append(part.iloc[first:last])
+        # copy the slices so the pipeline never modifies the cached columns, only
+        # the requested range is joined
+        if len(slices) > 1:
+            deals = concat(slices)
+        else:
+            deals = (slices[0] if slices else self.parts[0].iloc[:0]).copy()
+        deals.index = pd.RangeIndex(len(deals))
+        return deals
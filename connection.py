@@ -0,0 +1,80 @@
+# import the required modules
+import time  # for the age of the status and the reconnect delays
+import threading  # for reconnecting in the background
+
+# the seconds a checked status of the terminal is used before it is checked again
+STATUS_TTL = 2
+# the seconds to wait after the first failed reconnect, doubled after every failure
+RECONNECT_DELAY = 1
+# the longest wait between two reconnect attempts
+MAX_RECONNECT_DELAY = 60
+
+
+# define a class for watching the connection to the terminal: the status is
+# checked at most once per ttl, and a lost connection is restored in the
+# background so no refresh waits for a terminal that is restarting
+class ConnectionSupervisor:
+    def __init__(
+        self,
+        mt5,
+        ttl=STATUS_TTL,
+        delay=RECONNECT_DELAY,
+        max_delay=MAX_RECONNECT_DELAY,
+    ):
+        self.mt5 = mt5  # the MT5 object connecting to the terminal
+        self.ttl = ttl  # the seconds the status is trusted
+        self.delay = delay  # the wait after the first failed attempt
+        self.max_delay = max_delay  # the longest wait between the attempts
+        self.lock = threading.Lock()  # guards the status shared by the threads
+        self.connected = False  # the last known status
+        self.checked = None  # the time the status was checked last
+        self.reconnecting = False  # whether the reconnect thread is running
+        self.retry_at = None  # the time of the next reconnect attempt
+        self.stopped = threading.Event()
+
+    def is_connected(self):
+        # the status of the terminal, starting a reconnect if the connection is lost
+        with self.lock:
+            if self.reconnecting:
+                return False
+            now = time.monotonic()
+            if self.checked is None or now - self.checked >= self.ttl:
+                self.connected = self.mt5.is_connected()
+                self.checked = now
+            if not self.connected and not self.stopped.is_set():
+                self.reconnecting = True
+                threading.Thread(target=self.reconnect, daemon=True).start()
+            return self.connected
+
+    def get_connection(self):
+        # the status and the title showing it, never waiting for the terminal
+        if self.is_connected():
+            return True, self.mt5.get_connection_string("CONNECTED")
+        retry_at = self.retry_at
+        if retry_at is None:
+            return False, self.mt5.get_connection_string("RECONNECTING")
+        seconds = max(0, round(retry_at - time.monotonic()))
+        return False, self.mt5.get_connection_string(
+            f"DISCONNECTED, retrying in {seconds}s"
+        )
+
+    def reconnect(self):
+        # try to connect again, waiting twice as long after every failed attempt
+        delay = self.delay
+        while not self.stopped.is_set():
+            self.mt5.initialize()
+            if self.mt5.is_connected():
+                with self.lock:
+                    self.connected, self.checked = True, time.monotonic()
+                    self.reconnecting, self.retry_at = False, None
+                return
+            self.retry_at = time.monotonic() + delay
+            self.stopped.wait(delay)
+            self.retry_at = None
+            delay = min(delay * 2, self.max_delay)
+        with self.lock:
+            self.reconnecting = False
+
+    def stop(self):
+        # stop reconnecting, e.g. when the terminal is shut down
+        self.stopped.set()
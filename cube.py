@@ -0,0 +1,89 @@
+# import the required modules
+import numpy as np  # for the symbol codes
+import pandas as pd  # for data manipulation and analysis
+
+
+def empty_cells():
+    # the cells of the cube with the types of their levels, without any cells
+    return pd.DataFrame(
+        {"sum": pd.Series(dtype="float64"), "count": pd.Series(dtype="int64")},
+        index=pd.MultiIndex.from_arrays(
+            [
+                pd.Index([], dtype="int64"),
+                pd.Index([], dtype="int32"),
+                pd.DatetimeIndex([]),
+            ],
+            names=["magic", "symbol", "time"],
+        ),
+    )
+
+
+# define a class for the profit of every day, magic number and symbol: only the
+# combinations that occur are kept as cells (a sparse cube), sorted by magic
+# number, symbol code and day, so the symbols of one magic number are one slice
+class BreakdownCube:
+    def __init__(self, mt5):
+        self.mt5 = mt5  # the MT5 object for grouping the deals
+        self.symbols = pd.Index([], dtype=object)  # the symbol of every code
+        self.cells = empty_cells()  # the sum and count of the profit of every cell
+
+    def fold(self, deals):
+        # add the profit of new deals to the cells
+        if len(deals) == 0 or "symbol" not in deals:
+            return
+        with self.mt5.profiler.span("cube"):
+            grouped = self.mt5.group_data_by_time_and_magic(deals, "D", ["symbol"])
+            new = grouped["profit"].agg(["sum", "count"])
+            new.index = self.to_codes(new.index)
+            self.cells = self.merge(self.cells, new.sort_index())
+
+    def to_codes(self, index):
+        # store the symbols as codes of the symbols seen so far, adding the new ones
+        symbols = index.levels[index.names.index("symbol")].astype(str)
+        self.symbols = self.symbols.append(symbols.difference(self.symbols))
+        codes = self.symbols.get_indexer(symbols).astype("int32")
+        return pd.MultiIndex.from_arrays(
+            [
+                index.get_level_values("magic").astype("int64"),
+                codes[index.codes[index.names.index("symbol")]],
+                index.get_level_values("time"),
+            ],
+            names=["magic", "symbol", "time"],
+        )
+
+    def merge(self, cells, new_cells):
+        # add the new cells to the ones already known and insert the others
+        existing = new_cells.index.isin(cells.index)
+        updated = new_cells.index[existing]
+        if len(updated) > 0:
+            cells.loc[updated, ["sum", "count"]] += new_cells[existing].to_numpy()
+        added = new_cells[~existing]
+        if len(added) > 0:
+            cells = pd.concat([cells, added]).sort_index()
+        return cells
+
+    def get_cells(self, magic):
+        # the cells of one magic number, a slice of the sorted cells
+        index = self.cells.index
+        magics = index.get_level_values("magic")
+        start = magics.searchsorted(magic, side="left")
+        end = magics.searchsorted(magic, side="right")
+        return self.cells.iloc[start:end].droplevel("magic")
+
+    def get_breakdown(self, magic):
+        # the daily profit of every symbol traded by a magic number, as columns
+        cells = self.get_cells(magic)
+        daily = cells["sum"].unstack("symbol")
+        daily.columns = self.symbols[daily.columns.to_numpy()]
+        return daily
+
+    def get_totals(self, magic):
+        # the profit and the number of deals of every symbol of a magic number, the
+        # symbols driving the result first
+        cells = self.get_cells(magic)
+        totals = cells.groupby(level="symbol").sum()
+        totals.index = pd.Index(
+            self.symbols[totals.index.to_numpy()], name="symbol", dtype=object
+        )
+        order = np.argsort(-np.abs(totals["sum"].to_numpy()), kind="stable")
+        return totals.iloc[order]
@@ -1,51 +1,166 @@
-# import the required modules
+# import the required modules, the data and plotting modules take seconds to load
+# so they are imported in the background once the window is shown
 import tkinter as tk  # for creating graphical user interface
 from tkcalendar import DateEntry  # for creating calendar widgets
-import matplotlib.pyplot as plt  # for plotting graphs
-from matplotlib.backends.backend_tkagg import (
-    FigureCanvasTkAgg,
-)  # for embedding graphs in tkinter GUI
 import webbrowser  # for opening links in browser
 from tkinter import ttk  # for creating treeview and notebook widgets
 from datetime import datetime, date
-from mt import MT5
-import matplotlib.colors as mcolors
-import matplotlib.dates as mdates
 import re
+import time  # for measuring the startup
+import queue  # for passing the refresh results to the main thread
+import threading  # for refreshing the data in the background
+import cProfile  # for profiling a refresh
+from profiling import format_record
+
+
+# the interval in milliseconds to check for the result of a background refresh
+REFRESH_POLL_MS = 100
+# the number of magic numbers shown at once in the filters window
+FILTER_ROWS = 12
+# the milliseconds between the polls of the open positions in live mode
+POSITIONS_INTERVAL_MS = 2000
+# the intervals in seconds the live mode can poll for new deals
+LIVE_INTERVALS = [5, 15, 30, 60]
+# added to the title while the statistics shown are not up to date
+STALE_MARKER = " - STALE"
+
+
+def to_text(goal):
+    # show the goals that are not set as empty entries
+    return "" if goal is None else goal
+
+
+def import_modules():
+    # import the modules the refreshes and the plots need, so they are already
+    # loaded when the main thread uses them
+    import matplotlib.backends.backend_tkagg  # for embedding graphs in tkinter GUI
+    import aggregate  # for the statistics shown after a refresh
+    import live  # for the aggregates kept up to date in live mode
+    import summary  # for the rows of the treeview
+    import settings  # for the aliases, goals and states of the magics
 
 
 # define a class for creating and displaying the graphical user interface
 class GUI:
-    def __init__(self, root: tk.Tk, mt5: MT5):
+    def __init__(self, root: tk.Tk, create_mt5, profile_path=None, started=None):
         self.root = root  # the root window of the GUI
-        self.mt5 = mt5  # the MT5 object for accessing the data
-        self.tabs_list = [
-            "Sum Profit",
-            "Mean Profit",
-            "Reached Profit Goal",
-            "Profit with Goal Status",
-        ]  # the list of tabs for the plots
+        self.mt5 = None  # the MT5 object for accessing the data, once loaded
+        self.profile_path = profile_path  # the file a cProfile capture is dumped to
+        # the profile of the first refresh, if asked for
+        self.profile = cProfile.Profile() if profile_path else None
+        # the time the program started and the seconds until the window was shown,
+        # the modules were loaded (with the terminal connected) and the first chart
+        # was drawn
+        self.started = time.perf_counter() if started is None else started
+        self.startup = {}
+        self.tabs_list = []  # the list of tabs for the plots
         self.filters_window = None  # the window for editing the filters
+        self.settings = None  # the aliases, goals and states of the magics
+        self.live_mode = tk.BooleanVar(value=False)  # whether to poll for new deals
+        self.live_interval = tk.IntVar(value=15)  # the seconds between the polls
+        self.resolution = tk.StringVar(value="Day")  # the time resolution of the plots
+        self.basis = tk.StringVar(value="Deals")  # whether deals or trades are counted
+        self.streaming = tk.BooleanVar(value=False)  # whether to fetch month by month
         self.info_window = None  # the window for showing the information
+        self.breakdown_window = None  # the window showing the symbols of a magic
         self.create_options_menu()  # create the options menu
-        self.treeview = ttk.Treeview(root)  # create the treeview widget
-        self.tab_control = ttk.Notebook(root)  # create the notebook widget
         self.start_date, self.end_date = self.create_date_widgets(
             root
         )  # create date widgets and get their values
-        self.create_plot_button(root)  # create plot button
-        self.fig, self.canvas = self.create_canvas(
-            root
-        )  # create figure and canvas objects
+        self.plot_button = self.create_plot_button(root)  # create plot button
+        # create the progress bar and label for the background refresh
+        self.progress_bar, self.progress_label = self.create_progress_widgets(root)
+        self.refresh_id = 0  # the id of the latest refresh, older ones are stale
+        self.refresh_stage = ""  # the stage the running refresh is in
+        self.refresh_results = queue.Queue()  # the results of the refreshes
+        self.mt5_lock = threading.Lock()  # only one refresh uses the terminal
+        self.refresh_running = False  # whether a refresh is running
+        self.jobs = {}  # the id of the latest helper job of each kind
+        self.job_results = {}  # the results of the finished helper jobs by id
+        self.live_aggregate = None  # the daily aggregates of the last refresh
+        self.live_job = None  # the scheduled poll of the live mode
+        self.positions_job = None  # the scheduled poll of the positions
+        self.positions_poller = None  # the thread polling the positions
+        self.positions_totals = None  # the totals of the poll, None if unchanged
+        self.shown = None  # the aggregate, labels and colors shown last
+        self.connection_string = None  # the title shown last, without the timings
+        self.visible_tab = 0  # the tab shown, downsampled by the refresh thread
+        self.pending_plots = {}  # the data of the tabs updated once they are shown
+        self.plot_resolution = None  # the resolution of the pending tabs
+        # changing the dates cancels the refresh running for the old ones
+        self.start_date.bind("<<DateEntrySelected>>", self.cancel_refresh)
+        self.end_date.bind("<<DateEntrySelected>>", self.cancel_refresh)
+        self.root.bind("<Map>", self.window_shown, add="+")
+        # load the modules and connect to the terminal while the window is shown
+        self.load_result = None
+        self.loader = threading.Thread(
+            target=self.load_modules, args=(create_mt5,), daemon=True
+        )
+        self.loader.start()
+        self.progress_bar.start()
+        self.progress_label.config(text="Loading...")
+        self.root.after(REFRESH_POLL_MS, self.check_loaded)
+
+    def window_shown(self, event=None):
+        if "window" not in self.startup:
+            self.startup["window"] = time.perf_counter() - self.started
+
+    def load_modules(self, create_mt5):
+        # runs in the background, the widgets are only created on the main thread
+        try:
+            import_modules()
+            self.load_result = create_mt5()
+        except Exception as e:
+            self.load_result = e
+
+    def check_loaded(self):
+        # create the rest of the window once the modules are loaded
+        if self.loader.is_alive():
+            self.root.after(REFRESH_POLL_MS, self.check_loaded)
+            return
+        self.stop_progress()
+        if isinstance(self.load_result, Exception):
+            print("loading failed:", self.load_result)
+            self.progress_label.config(text="Loading failed")
+            return
+        self.mt5 = self.load_result
+        self.startup["loaded"] = time.perf_counter() - self.started
+        self.create_data_widgets()
+        self.plot_button.config(state=tk.NORMAL)
+        # the first refresh starts once the new widgets are painted
+        self.root.after_idle(self.plot_data)
+
+    def create_data_widgets(self):
+        from aggregate import TABS_LIST
+        from pyramid import RESOLUTIONS
+        from trades import BASES
+        from summary import SummaryTable
+        from positions import PositionTracker
+        from settings import SettingsStore
+
+        root = self.root
+        self.tabs_list = TABS_LIST
+        self.settings = SettingsStore()
+        self.resolution_box.config(values=list(RESOLUTIONS))
+        self.basis_box.config(values=BASES)
+        # the open positions, polled more often than the deals in live mode
+        self.position_tracker = PositionTracker(self.mt5)
+        self.treeview = ttk.Treeview(root)  # create the treeview widget
+        self.summary = SummaryTable(self.treeview)  # the rows of the treeview
+        self.tab_control = ttk.Notebook(root)  # create the notebook widget
         self.create_tree_view()  # create the tree view widget
         self.tab_control.pack(
             fill="both", expand=True
         )  # pack the tab control widget into the root window and display it
-        # create a new figure for each tab
+        # create a figure for each tab, reused by every refresh
+        self.plots = []
         for title in self.tabs_list:
             frame = ttk.Frame(self.tab_control)
             frame.pack(side=tk.TOP, fill=tk.BOTH, expand=1)
             self.tab_control.add(frame, text=title)
+            self.plots.append(self.create_canvas(frame))
+        # the hidden tabs are only drawn once they are shown
+        self.tab_control.bind("<<NotebookTabChanged>>", self.draw_visible_plot)
 
     def create_date_widgets(self, parent):
         # create a frame to hold the date widgets
@@ -84,6 +199,30 @@ class GUI:
         end_date.grid(
             row=0, column=3, padx=10, pady=10
         )  # place the widget in a grid layout
+        # create a combobox to choose the time resolution of the plots
+        resolution_label = tk.Label(date_frame, text="Resolution:")
+        resolution_label.grid(row=0, column=4, padx=10, pady=10, sticky="E")
+        # the choices are added once the modules are loaded
+        self.resolution_box = ttk.Combobox(
+            date_frame,
+            textvariable=self.resolution,
+            state="readonly",
+            width=8,
+        )
+        self.resolution_box.grid(row=0, column=5, padx=10, pady=10)
+        self.resolution_box.bind("<<ComboboxSelected>>", self.change_resolution)
+        # create a combobox to choose whether the deals or the trades are counted
+        basis_label = tk.Label(date_frame, text="Basis:")
+        basis_label.grid(row=0, column=6, padx=10, pady=10, sticky="E")
+        self.basis_box = ttk.Combobox(
+            date_frame,
+            textvariable=self.basis,
+            state="readonly",
+            width=8,
+        )
+        self.basis_box.grid(row=0, column=7, padx=10, pady=10)
+        # the aggregates of the other basis are grouped from the deals again
+        self.basis_box.bind("<<ComboboxSelected>>", lambda event: self.plot_data())
         return start_date, end_date  # return the date widgets for later use
 
     def create_plot_button(self, parent):
@@ -100,158 +239,623 @@ class GUI:
         )  # place the button with some padding
 
     def create_plot_button(self, parent):
-        # create a button to plot the data based on the selected dates
-        plot_button = tk.Button(parent, text="Plot Data", command=self.plot_data)
+        # create a button to plot the data based on the selected dates, enabled
+        # once the modules are loaded
+        plot_button = tk.Button(
+            parent, text="Plot Data", command=self.plot_data, state=tk.DISABLED
+        )
         plot_button.pack(
             pady=(0, 10), padx=(150, 150)
         )  # place the button with some padding
+        return plot_button
 
     def create_canvas(self, parent):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        import matplotlib.dates as mdates
+
         # create a figure object to hold the graph
-        self.fig = plt.Figure(figsize=(5, 4), dpi=100)
+        fig = Figure(figsize=(5, 4), dpi=100)
+        ax = fig.add_subplot(111)
+        ax.set_xlabel("time")
+        ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+        ax.xaxis.set_major_formatter(mdates.DateFormatter("%Y-%m-%d"))
 
         # create a canvas object to display the figure in tkinter GUI
-        canvas = FigureCanvasTkAgg(self.fig, master=parent)
+        canvas = FigureCanvasTkAgg(fig, master=parent)
+        canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
 
-        return self.fig, canvas  # return the figure and canvas objects for later use
+        # keep the figure and its lines by magic number to update them in place
+        return {"fig": fig, "canvas": canvas, "ax": ax, "lines": {}, "dirty": False}
 
     def read_data_file(self):
-        try:
-            with open("data.txt", "r") as f:
-                data = eval(f.read())
-                return data
-        except FileNotFoundError:
-            return None
+        # the settings are parsed again only when the file changed
+        return self.settings.load()
+
+    def create_progress_widgets(self, parent):
+        # create a frame to show the progress of the running refresh
+        progress_frame = tk.Frame(parent)
+        progress_frame.pack(pady=(0, 10))
+        progress_bar = ttk.Progressbar(progress_frame, mode="indeterminate", length=200)
+        progress_bar.grid(row=0, column=0, padx=10)
+        progress_label = tk.Label(progress_frame, text="", width=30, anchor="w")
+        progress_label.grid(row=0, column=1, padx=10)
+        return progress_bar, progress_label
 
     # define a function to plot the data based on the selected dates
     def plot_data(self):
-        is_connected, connection_string = self.mt5.get_connection()
-        self.root.title(connection_string)
-        if not is_connected:
-            self.mt5.initialize()
-            is_connected, connection_string = self.mt5.get_connection()
-            self.root.title(connection_string)
-            if not is_connected:
-                return
-
+        if self.mt5 is None:
+            return  # still loading, the first refresh starts once loaded
+        # read the widgets on the main thread before going to the background
         start_date = self.start_date.get_date()
         end_date = self.end_date.get_date()
-        # convert the dates to datetime objects
-        start_datetime = datetime.combine(start_date, datetime.min.time())
+        # check if there is a data.txt file saved from the save_data function
+        # read the data dictionary from the file
+        saved_data = self.read_data_file()
+        self.start_refresh(
+            self.get_refresh_data,
+            start_date,
+            end_date,
+            saved_data,
+            self.resolution.get(),
+            self.basis.get(),
+            self.streaming.get(),
+            stage="Connecting...",
+        )
+
+    def start_refresh(self, compute, *args, stage=""):
+        # start a new refresh, any refresh still running becomes stale
+        self.refresh_id += 1
+        refresh_id = self.refresh_id
+        self.refresh_running = True
+        self.refresh_stage = stage
+        self.progress_bar.start()
+        worker = threading.Thread(
+            target=self.run_refresh,
+            args=(refresh_id, compute, *args),
+            daemon=True,
+        )
+        worker.start()
+        self.root.after(REFRESH_POLL_MS, self.check_refresh, refresh_id)
+
+    def cancel_refresh(self, event=None):
+        # make the running refresh stale so its result is discarded
+        self.refresh_id += 1
+        self.refresh_running = False
+        self.live_aggregate = None
+        self.stop_progress()
+
+    def stop_progress(self):
+        self.progress_bar.stop()
+        self.progress_label.config(text="")
+
+    def run_refresh(self, refresh_id, compute, *args):
+        # run the data work in the background and hand the result to the main thread
+        try:
+            with self.mt5_lock:
+                self.mt5.profiler.start()
+                profile = self.profile
+                if profile:
+                    profile.enable()
+                try:
+                    result = compute(refresh_id, *args)
+                finally:
+                    if profile:
+                        profile.disable()
+        except Exception as e:
+            result = {"error": e}
+        if result is not None:
+            self.refresh_results.put((refresh_id, result))
+
+    def start_job(self, kind, compute, show, *args):
+        # run a helper job (e.g. loading the magic numbers for a window) in the
+        # background: it only waits for the terminal, never cancels a refresh and is
+        # never cancelled by one, a newer job of the same kind replaces it
+        job_id = self.jobs.get(kind, 0) + 1
+        self.jobs[kind] = job_id
+        worker = threading.Thread(
+            target=self.run_job, args=(kind, job_id, compute, *args), daemon=True
+        )
+        worker.start()
+        self.progress_bar.start()
+        self.root.after(REFRESH_POLL_MS, self.check_job, kind, job_id, worker, show)
+
+    def run_job(self, kind, job_id, compute, *args):
+        try:
+            with self.mt5_lock:
+                result = compute(*args)
+        except Exception as e:
+            result = e
+        self.job_results[kind, job_id] = result
+
+    def check_job(self, kind, job_id, worker, show):
+        # show the result of the helper job on the main thread once it is done
+        if worker.is_alive():
+            self.root.after(REFRESH_POLL_MS, self.check_job, kind, job_id, worker, show)
+            return
+        if not self.refresh_running:
+            self.stop_progress()
+        result = self.job_results.pop((kind, job_id))
+        if job_id != self.jobs[kind]:
+            return  # a newer job of the same kind replaced it
+        if isinstance(result, Exception):
+            print("{} failed: {}".format(kind, result))
+            return
+        show(result)
+
+    def is_stale(self, refresh_id, stage=None):
+        # check if the refresh was cancelled, otherwise show the next stage
+        if refresh_id != self.refresh_id:
+            return True
+        if stage:
+            self.refresh_stage = stage
+        return False
+
+    def get_end_datetime(self, end_date):
+        # the end date of today means up to now
         end_datetime = datetime.combine(end_date, datetime.min.time())
         if end_datetime.date() == date.today():
             end_datetime = datetime.now()
-        # fetch the data from MetaTrader 5
-        deals = self.mt5.fetch_data(start_datetime, end_datetime)
-        if deals == None or len(deals) == 0:
+        return end_datetime
+
+    def get_refresh_data(
+        self,
+        refresh_id,
+        start_date,
+        end_date,
+        saved_data,
+        resolution,
+        basis="Deals",
+        streaming=False,
+    ):
+        if self.is_stale(refresh_id):
+            return None
+        # the terminal is reconnected in the background, never waited for here
+        is_connected, connection_string = self.mt5.connection.get_connection()
+
+        # convert the dates to datetime objects
+        start_datetime = datetime.combine(start_date, datetime.min.time())
+        end_datetime = self.get_end_datetime(end_date)
+        if self.is_stale(refresh_id, "Fetching deals..."):
+            return None
+        if not is_connected:
+            # show the deals the cache holds until the terminal is back, marked as
+            # stale, or keep showing the last refresh
+            connection_string += STALE_MARKER
+            deals = self.mt5.get_cached_data(start_datetime, end_datetime)
+            if deals is None or len(deals) == 0:
+                return {"title": connection_string, "unchanged": True}
+        elif streaming:
+            # fetch and group the deals a month at a time, keeping the memory low
+            deals = self.mt5.stream_data(start_datetime, end_datetime)
+        else:
+            # fetch the data from MetaTrader 5
+            deals = self.mt5.fetch_data(start_datetime, end_datetime)
+            if deals is None or len(deals) == 0:
+                return {"title": connection_string, "deals": None}
+            if self.is_stale(refresh_id, "Grouping deals..."):
+                return None
+        from live import LiveAggregate
+
+        # group the deals by day and magic number, kept up to date in live mode
+        # a cancelled refresh stops between the chunks and releases the terminal
+        live_aggregate = LiveAggregate(
+            self.mt5,
+            saved_data,
+            deals,
+            start_date,
+            end_date,
+            basis,
+            cancelled=lambda: self.is_stale(refresh_id),
+        )
+        if self.is_stale(refresh_id, "Calculating statistics..."):
+            return None
+        if live_aggregate.last_time is None:
+            return {"title": connection_string, "deals": None}
+        return self.get_aggregate_data(connection_string, live_aggregate, resolution)
+
+    def get_live_data(self, refresh_id, live_aggregate, resolution):
+        # fold the deals executed since the last refresh into the aggregates
+        if self.is_stale(refresh_id):
+            return None
+        is_connected, connection_string = self.mt5.connection.get_connection()
+        if not is_connected:
+            return {"title": connection_string + STALE_MARKER, "unchanged": True}
+        if not live_aggregate.poll(self.get_end_datetime(live_aggregate.end_date)):
+            return {"title": connection_string, "unchanged": True}
+        if self.is_stale(refresh_id, "Calculating statistics..."):
+            return None
+        return self.get_aggregate_data(connection_string, live_aggregate, resolution)
+
+    def get_resolution_data(self, refresh_id, live_aggregate, resolution, title):
+        # show the aggregates of the last refresh at another resolution
+        if self.is_stale(refresh_id):
+            return None
+        return self.get_aggregate_data(title, live_aggregate, resolution)
+
+    def get_aggregate_data(self, connection_string, live_aggregate, resolution):
+        from aggregate import AggregateResult
+
+        # get everything the plots and the treeview show from the aggregates
+        # the treeview always shows the daily statistics
+        with self.mt5.profiler.span("stats"):
+            daily = live_aggregate.pyramid.get("Day")
+            self.position_tracker.set_start_date(live_aggregate.start_date)
+            self.position_tracker.poll()
+            aggregate = AggregateResult(
+                self.tabs_list,
+                live_aggregate.pyramid.get(resolution),
+                daily,
+                self.position_tracker.totals,
+                live_aggregate.metrics.get_table(),
+                live_aggregate.metrics.get_curve(resolution),
+            )
+        self.mt5.profiler.count("magics", len(aggregate.magics))
+        # downsample the lines of the visible tab here rather than on the main thread
+        tab = self.visible_tab
+        with self.mt5.profiler.span("downsample"):
+            lines = self.get_lines(aggregate.plot_data[tab][2])
+        return {
+            "title": connection_string,
+            "deals": daily,
+            "saved_data": live_aggregate.saved_data,
+            "live_aggregate": live_aggregate,
+            "resolution": resolution,
+            "aggregate": aggregate,
+            "lines": (tab, lines),
+        }
+
+    def check_refresh(self, refresh_id):
+        # poll for the result of the background refresh on the main thread
+        if refresh_id != self.refresh_id:
+            return
+        try:
+            result_id, result = self.refresh_results.get_nowait()
+        except queue.Empty:
+            self.progress_label.config(text=self.refresh_stage)
+            self.root.after(REFRESH_POLL_MS, self.check_refresh, refresh_id)
+            return
+        if result_id != self.refresh_id:
+            # a stale result, keep waiting for the current one
+            self.root.after(REFRESH_POLL_MS, self.check_refresh, refresh_id)
+            return
+        self.refresh_running = False
+        self.stop_progress()
+        if self.profile:
+            # the drawing runs on the main thread, add it to the same profile
+            self.profile.enable()
+        try:
+            self.show_refresh(result)
+        finally:
+            if self.profile:
+                self.profile.disable()
+                self.profile.dump_stats(self.profile_path)
+                print("profile written to", self.profile_path)
+                self.profile = None
+        # show the timings of the stages next to the last update
+        record = self.mt5.profiler.finish()
+        if record and "title" in result:
+            self.root.title(result["title"] + " - " + format_record(record))
+
+    def show_refresh(self, result):
+        self.show_result(result)
+        if "chart" not in self.startup:
+            # the first refresh is shown, report how long the startup took
+            self.startup["chart"] = time.perf_counter() - self.started
+            print(
+                "startup:",
+                ", ".join(f"{name} {s:.2f}s" for name, s in self.startup.items()),
+            )
+            self.mt5.profiler.write({"startup": self.startup})
+
+    def show_result(self, result):
+        if "error" in result:
+            print("refresh failed:", result["error"])
+            return
+        self.root.title(result["title"])
+        self.connection_string = result["title"]
+        if result.get("unchanged"):
+            return
+        if result["deals"] is None:
+            self.live_aggregate = None
             self.clear_all()
             return
-        # check if there is a data.txt file saved from the save_data function
-        # read the data dictionary from the file
-        saved_data = self.read_data_file()
-        deals = self.mt5.get_filtered_deals(saved_data, deals)
-        # group the data by time and magic number and sum up the profit values
-        filtered_data = self.mt5.group_data_by_time_and_magic(deals)
-        # clear the treeview
-        self.treeview.delete(*self.treeview.get_children())
-        # create a tab container to hold the plots
-        # create a new figure for each tab
-        self.fig.clear()
-        for i, title, data in self.mt5.get_plot_data(
-            saved_data, self.tabs_list, filtered_data
-        ):
-            self.fig = plt.Figure(figsize=(5, 4), dpi=100)
-            ax = self.fig.add_subplot(111)
-            data.unstack().plot(ax=ax)
-            ax.xaxis.set_major_formatter(mdates.DateFormatter("%Y-%m-%d"))
-
-            # rotate the x-axis labels for better visibility
-            plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
-            ax.set_title(title + " by Magic Number")
-            # create a new canvas for each tab
-            # add the canvas to the tab and the tab to the tab control
-            tab = self.tab_control.tabs()[i]
-            if self.tab_control.tab(tab, "text") == title:
-                tab_frame = self.tab_control.nametowidget(tab)
-                for tab_child in tab_frame.winfo_children():
-                    tab_child.destroy()
-                canvas = FigureCanvasTkAgg(self.fig, master=tab_frame)
-                canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
-                canvas.draw()
-        lines = ax.get_lines()
-        total_profit_df = filtered_data.sum().groupby("magic").agg({"profit": "sum"})
-        mean_profit_df = (
-            filtered_data["profit"]
-            .mean()
-            .groupby("magic")
-            .agg(profit="mean")
-            .reset_index()
-        )
-        # configure treeview tags to match chart colors
-        for i, line in enumerate(lines):
-            tag_name = f"magic_{line.get_label()}"
-            color = mcolors.to_hex(line.get_color())
-            self.treeview.tag_configure(tag_name, background=color)
-            # deals.reset_index()
-        positions_count = self.mt5.get_positions(start_date, deals)
-        # clear previous treeview items and insert new items with updated tags
-        self.treeview.delete(*self.treeview.get_children())
-        for magic_number, row in total_profit_df.iterrows():
-            mean_mask = mean_profit_df["magic"] == magic_number
-            tag_name = f"magic_{magic_number}"
-            self.treeview.insert(
-                "",
-                "end",
-                values=[
-                    magic_number,
-                    mean_profit_df[mean_mask]["profit"].values[0],
-                    row["profit"],
-                    positions_count.get(magic_number, 0),
-                ],
-                tags=[tag_name],
+        self.live_aggregate = result["live_aggregate"]
+        if len(result["deals"]) == 0:
+            # no trade was closed yet, the live mode shows them once they are
+            self.clear_all()
+            return
+        self.show_plot_data(result)
+
+    def toggle_live_mode(self):
+        # start or stop polling for new deals and positions
+        if self.live_job:
+            self.root.after_cancel(self.live_job)
+            self.live_job = None
+        if self.positions_job:
+            self.root.after_cancel(self.positions_job)
+            self.positions_job = None
+        if self.live_mode.get():
+            self.live_job = self.root.after(
+                self.live_interval.get() * 1000, self.live_tick
+            )
+            self.positions_job = self.root.after(
+                POSITIONS_INTERVAL_MS, self.positions_tick
             )
 
-    def clear_all(self):
-        # clear all tabs
-        for tab in self.tab_control.tabs():
-            tab_frame = self.tab_control.nametowidget(tab)
-            for tab_child in tab_frame.winfo_children():
-                tab_child.destroy()
-        for child in self.treeview.get_children():
-            self.treeview.delete(child)
-
-    def clear_plot(self):
-        if self.canvas:
-            self.canvas.get_tk_widget().destroy()  # destroy the widget
-        for child in self.treeview.get_children():
-            self.treeview.delete(child)
+    def positions_tick(self):
+        # poll the open positions in the background unless the last poll is running
+        self.positions_job = self.root.after(POSITIONS_INTERVAL_MS, self.positions_tick)
+        if self.shown is None or self.positions_poller is not None:
+            return
+        self.positions_poller = threading.Thread(
+            target=self.poll_positions, daemon=True
+        )
+        self.positions_poller.start()
+        self.root.after(REFRESH_POLL_MS, self.check_positions)
 
-    def create_tree_view(self):
-        self.treeview["columns"] = (
-            "Magic Number",
-            "Mean Daily Profit",
-            "Total Profit",
-            "Opened Positions",
+    def poll_positions(self):
+        # runs in the background, skipping the poll while a refresh is using the
+        # terminal
+        self.positions_totals = None
+        if not self.mt5.connection.is_connected():
+            return
+        if not self.mt5_lock.acquire(blocking=False):
+            return
+        try:
+            if self.position_tracker.poll():
+                self.positions_totals = self.position_tracker.totals
+        finally:
+            self.mt5_lock.release()
+
+    def check_positions(self):
+        # update the position columns of the treeview once the poll is done
+        if self.positions_poller.is_alive():
+            self.root.after(REFRESH_POLL_MS, self.check_positions)
+            return
+        self.positions_poller = None
+        totals, self.positions_totals = self.positions_totals, None
+        if totals is not None and self.shown is not None:
+            aggregate, labels, magic_colors = self.shown
+            aggregate.set_positions(totals)
+            self.summary.update(aggregate, labels, magic_colors)
+
+    def live_tick(self):
+        # check for new deals unless a refresh is still running
+        self.live_job = self.root.after(self.live_interval.get() * 1000, self.live_tick)
+        if self.refresh_running:
+            return
+        if self.live_aggregate is None:
+            self.plot_data()
+            return
+        self.start_refresh(
+            self.get_live_data,
+            self.live_aggregate,
+            self.resolution.get(),
+            stage="Checking new deals...",
+        )
+
+    def change_resolution(self, event=None):
+        # regroup the last refresh at the new resolution without fetching again
+        if self.live_aggregate is None or self.refresh_running:
+            self.plot_data()
+            return
+        self.start_refresh(
+            self.get_resolution_data,
+            self.live_aggregate,
+            self.resolution.get(),
+            self.connection_string,
+            stage="Grouping deals...",
         )
 
-        # format column headings
-        self.treeview.column("#0", width=0, stretch=tk.NO)
-        self.treeview.column("Magic Number", anchor=tk.CENTER, width=100)
-        self.treeview.column("Mean Daily Profit", anchor=tk.CENTER, width=100)
-        self.treeview.column("Total Profit", anchor=tk.CENTER, width=100)
-        self.treeview.column("Opened Positions", anchor=tk.CENTER, width=100)
+    def show_plot_data(self, result):
+        import matplotlib
+
+        saved_data = result["saved_data"]
+        aggregate = result["aggregate"]
+        # give every magic number the same color in all tabs and the treeview
+        magics = aggregate.magics.index
+        colors = matplotlib.rcParams["axes.prop_cycle"].by_key()["color"]
+        magic_colors = {
+            magic: colors[i % len(colors)] for i, magic in enumerate(magics)
+        }
+        # show the aliases only on the plotted magic numbers
+        labels = {
+            magic: self.mt5.get_magic_label(saved_data, magic) for magic in magics
+        }
+        self.shown = aggregate, labels, magic_colors
+        self.plot_resolution = result["resolution"]
+        # only the visible tab is updated and drawn, the others once they are shown
+        self.pending_plots = {
+            i: (title, data) for i, title, data in aggregate.plot_data
+        }
+        tab, lines = result["lines"]
+        self.draw_visible_plot(lines={tab: lines})
+        # update only the treeview rows that changed
+        with self.mt5.profiler.span("treeview"):
+            self.summary.update(aggregate, labels, magic_colors)
+
+    def get_lines(self, data):
+        # the points of the line of every magic number, long lines downsampled for
+        # drawing; no widget is touched, so it also runs in the refresh thread
+        import numpy as np
+        import matplotlib.dates as mdates
+        from pyramid import MAX_PLOT_POINTS, decimate
+
+        data = data.unstack()
+        x = mdates.date2num(data.index)
+        values = data.to_numpy()
+        lines = {}
+        for j, magic in enumerate(data.columns):
+            line_x, y = x, values[:, j]
+            if len(y) > MAX_PLOT_POINTS:
+                points = ~np.isnan(y)
+                line_x, y = x[points], y[points]
+                indices = decimate(y)
+                line_x, y = line_x[indices], y[indices]
+            lines[magic] = line_x, y
+        return lines
+
+    def update_plot(self, i, title, line_data, labels, magic_colors, resolution):
+        import matplotlib.dates as mdates
+        from matplotlib.artist import setp
 
-        self.treeview.heading("#0", text="", anchor=tk.CENTER)
-        self.treeview.heading("Magic Number", text="Magic Number", anchor=tk.CENTER)
-        self.treeview.heading(
-            "Mean Daily Profit", text="Mean Daily Profit", anchor=tk.CENTER
+        plot = self.plots[i]
+        ax = plot["ax"]
+        lines = plot["lines"]
+        # remove the lines of the magic numbers that are not shown anymore
+        for magic in list(lines):
+            if magic not in line_data:
+                lines.pop(magic).remove()
+        # update the data of the existing lines and add the new ones
+        for magic, (x, y) in line_data.items():
+            if magic in lines:
+                lines[magic].set_data(x, y)
+            else:
+                (lines[magic],) = ax.plot(x, y)
+            lines[magic].set_label(labels[magic])
+            lines[magic].set_color(magic_colors[magic])
+        ax.relim()
+        ax.autoscale_view()
+        ax.legend(
+            [lines[magic] for magic in line_data],
+            [labels[magic] for magic in line_data],
+            title="magic",
         )
-        self.treeview.heading("Total Profit", text="Profit", anchor=tk.CENTER)
-        self.treeview.heading("Opened Positions", text="Positions", anchor=tk.CENTER)
+        ax.xaxis.set_major_formatter(
+            mdates.DateFormatter(
+                "%Y-%m-%d %H:%M" if resolution == "Hour" else "%Y-%m-%d"
+            )
+        )
+        # rotate the x-axis labels for better visibility
+        setp(ax.get_xticklabels(), rotation=45, ha="right")
+        ax.set_title(title + " by Magic Number")
+        # the tab is drawn when it is shown
+        plot["dirty"] = True
+
+    def draw_plot(self, i):
+        plot = self.plots[i]
+        # draw now rather than when idle, so the drawing is timed with the refresh
+        with self.mt5.profiler.span("draw"):
+            plot["canvas"].draw()
+        plot["dirty"] = False
+
+    def draw_visible_plot(self, event=None, lines=None):
+        i = self.tab_control.index(self.tab_control.select())
+        self.visible_tab = i
+        if i in self.pending_plots:
+            # update the tab with the lines of the refresh, or downsample them now
+            # if another tab was shown when the refresh started
+            title, data = self.pending_plots.pop(i)
+            aggregate, labels, magic_colors = self.shown
+            line_data = (lines or {}).get(i)
+            if line_data is None:
+                with self.mt5.profiler.span("downsample"):
+                    line_data = self.get_lines(data)
+            with self.mt5.profiler.span("render"):
+                self.update_plot(
+                    i, title, line_data, labels, magic_colors, self.plot_resolution
+                )
+        if self.plots[i]["dirty"]:
+            self.draw_plot(i)
+
+    def clear_all(self):
+        # clear all tabs
+        self.pending_plots = {}
+        for i, plot in enumerate(self.plots):
+            for line in plot["lines"].values():
+                line.remove()
+            plot["lines"].clear()
+            legend = plot["ax"].get_legend()
+            if legend:
+                legend.remove()
+            plot["dirty"] = True
+        self.draw_visible_plot()
+        self.summary.clear()
+        self.shown = None
+
+    def create_tree_view(self):
+        self.summary.create()
+        # double-click a row to see which symbols drive its result
+        self.treeview.bind("<Double-1>", self.show_breakdown_window)
 
         # pack the self.treeview.view widget into the root window and display it
         self.treeview.pack(fill="both", expand=True)
 
+    def clear_breakdown_window(self):
+        self.breakdown_window.destroy()
+        self.breakdown_window = None
+
+    def show_breakdown_window(self, event=None):
+        # show the profit of every symbol of the magic number of the clicked row
+        iid = self.treeview.identify_row(event.y) if event else self.treeview.focus()
+        if not iid or self.live_aggregate is None or self.shown is None:
+            return
+        # the symbols are grouped in the background, the first time from the deals
+        # fetched again
+        self.start_job(
+            "breakdown",
+            self.get_breakdown_data,
+            self.create_breakdown_window,
+            self.live_aggregate,
+            int(iid),
+        )
+
+    def get_breakdown_data(self, live_aggregate, magic):
+        cube = live_aggregate.get_cube()
+        totals = cube.get_totals(magic)
+        # the equity of every symbol, the symbols driving the result first
+        equity = cube.get_breakdown(magic)[totals.index].fillna(0).cumsum()
+        return magic, totals, equity
+
+    def create_breakdown_window(self, breakdown):
+        magic, totals, equity = breakdown
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        import matplotlib.dates as mdates
+        from matplotlib.artist import setp
+
+        label = self.shown[1].get(magic, magic) if self.shown else magic
+        if self.breakdown_window:
+            self.clear_breakdown_window()
+        self.breakdown_window = tk.Toplevel()
+        self.breakdown_window.title(f"Symbols of {label}")
+        self.breakdown_window.protocol("WM_DELETE_WINDOW", self.clear_breakdown_window)
+        self.center_window(self.breakdown_window, w=900, h=600)
+        # the totals of every symbol
+        table = ttk.Treeview(
+            self.breakdown_window,
+            columns=("symbol", "profit", "deals"),
+            show="headings",
+            height=min(len(totals), 8),
+        )
+        for column, heading in [
+            ("symbol", "Symbol"),
+            ("profit", "Total Profit"),
+            ("deals", "Deals"),
+        ]:
+            table.heading(column, text=heading, anchor="center")
+            table.column(column, anchor="center", width=150)
+        for symbol, row in totals.iterrows():
+            table.insert(
+                "", tk.END, values=(symbol, round(row["sum"], 2), row["count"])
+            )
+        table.pack(fill="x", padx=10, pady=10)
+        # the equity of every symbol over time
+        fig = Figure(figsize=(5, 4), dpi=100)
+        ax = fig.add_subplot(111)
+        for symbol in equity.columns:
+            ax.plot(equity.index, equity[symbol].to_numpy(), label=symbol)
+        ax.legend(title="symbol")
+        ax.set_xlabel("time")
+        ax.xaxis.set_major_formatter(mdates.DateFormatter("%Y-%m-%d"))
+        setp(ax.get_xticklabels(), rotation=45, ha="right")
+        ax.set_title(f"Equity by Symbol of {label}")
+        fig.tight_layout()
+        canvas = FigureCanvasTkAgg(fig, master=self.breakdown_window)
+        canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+        canvas.draw()
+
     # define a function to create an options menu
     def create_options_menu(self):
         # create a menu bar
@@ -276,6 +880,31 @@ class GUI:
             else self.show_information(),
         )
 
+        # add a check button to the options menu to poll for new deals
+        options_menu.add_checkbutton(
+            label="Live mode",
+            variable=self.live_mode,
+            command=self.toggle_live_mode,
+        )
+
+        # add a menu to choose how often the live mode polls for new deals
+        interval_menu = tk.Menu(options_menu, tearoff=0)
+        for seconds in LIVE_INTERVALS:
+            interval_menu.add_radiobutton(
+                label=f"{seconds} seconds",
+                variable=self.live_interval,
+                value=seconds,
+                command=self.toggle_live_mode,
+            )
+        options_menu.add_cascade(label="Live interval", menu=interval_menu)
+
+        # add a check button to the options menu to fetch long histories by month
+        options_menu.add_checkbutton(
+            label="Streaming fetch",
+            variable=self.streaming,
+            command=self.plot_data,
+        )
+
         # add the options menu to the menu bar
         menu_bar.add_cascade(label="Options", menu=options_menu)
 
@@ -298,11 +927,44 @@ class GUI:
             return False
 
     def show_edit_filters_window(self):
-        # get the deals as a pandas dataframe
-        mt_deals = self.mt5.fetch_data(0, datetime.now())
-        deals = self.mt5.convert_data_to_dataframe(mt_deals)
-        # get the unique magic values as a list
-        magic_values = sorted(deals["magic"].unique().tolist())
+        if self.mt5 is None:
+            return
+        # get the distinct magic numbers from the index kept up to date by the cache,
+        # the first time from the whole history, and open the window once they are
+        # loaded in the background
+        self.start_job(
+            "magic index", self.mt5.get_magic_index, self.create_filters_window
+        )
+
+    def create_filters_window(self, magic_index):
+        if self.filters_window:
+            self.filters_window.focus_set()
+            return
+        # check if there are settings saved from the save_data function
+        data = self.read_data_file()
+        # keep the settings of every magic number in a list, only the visible rows
+        # get widgets
+        self.filter_rows = []
+        for magic, info in magic_index.iterrows():
+            magic_data = data.get(str(magic), None) if data else None
+            if magic_data:
+                row = {
+                    "state": magic_data.get("state", 0),
+                    "alias": magic_data.get("alias", ""),
+                    "profit": to_text(magic_data["profit"]),
+                    "loss": to_text(magic_data["loss"]),
+                }
+            else:
+                # the magic numbers are shown only when there are no saved filters
+                row = {"state": 0 if data else 1, "alias": "", "profit": "", "loss": ""}
+            row["magic"] = str(magic)
+            row["info"] = "{} deals, last on {}".format(
+                info["count"], datetime.utcfromtimestamp(info["last_time"]).date()
+            )
+            self.filter_rows.append(row)
+        self.filter_matches = self.filter_rows  # the rows matching the search
+        self.filter_offset = 0  # the first row shown
+
         self.filters_window = tk.Toplevel()
         self.filters_window.title("Show Information")
         self.filters_window.protocol(
@@ -310,89 +972,77 @@ class GUI:
             self.clear_filters_window,
         )
         # update the window to get the correct size
-        self.center_window(self.filters_window, w=800, h=300)
-        # create a frame for the grid layout
-        grid_frame = tk.Frame(self.filters_window)
-        checkboxes = []
-        checkboxes_states = []
-
-        # create a list of labels and entries for each magic value
-        labels = []
-        entries = []
-        # loop through the magic values
-        for i, magic in enumerate(magic_values):
-            variable = tk.IntVar()
+        self.center_window(self.filters_window, w=900, h=600)
+        # create an entry to search the magic numbers and aliases
+        search_frame = tk.Frame(self.filters_window)
+        search_label = tk.Label(search_frame, text="Search:", padx=10, pady=10)
+        search_var = tk.StringVar()
+        search_var.trace_add(
+            "write", lambda *args: self.search_filters(search_var.get())
+        )
+        search_entry = tk.Entry(search_frame, textvariable=search_var)
+        search_label.pack(side=tk.LEFT)
+        search_entry.pack(side=tk.LEFT)
+        # create a frame for the grid layout and a scrollbar to move the rows
+        list_frame = tk.Frame(self.filters_window)
+        grid_frame = tk.Frame(list_frame)
+        self.filters_scrollbar = tk.Scrollbar(
+            list_frame, orient=tk.VERTICAL, command=self.scroll_filters
+        )
+        validate_command = (self.filters_window.register(self.validate_float), "%P")
+        # create a fixed number of rows, reused for the magic numbers scrolled in
+        self.filter_widgets = []
+        for i in range(FILTER_ROWS):
+            variables = {
+                "state": tk.IntVar(),
+                "alias": tk.StringVar(),
+                "profit": tk.StringVar(),
+                "loss": tk.StringVar(),
+            }
             checkbox = tk.Checkbutton(
-                grid_frame, text=str(magic), variable=variable, padx=10, pady=10
+                grid_frame, variable=variables["state"], padx=10, pady=10, width=10
             )
-            # create a label with the value of the magic
-            label = tk.Label(grid_frame, text=str(magic), padx=10, pady=10)
+            # create a label with the number of deals of the magic
+            label = tk.Label(grid_frame, padx=10, pady=10, width=30)
             # create an entry for the user to see the alias for the magic
-            entry = tk.Entry(grid_frame)
+            entry = tk.Entry(grid_frame, textvariable=variables["alias"])
             # create a label for the profit goal
             profit_label = tk.Label(grid_frame, text="Profit Goal:", padx=10, pady=10)
             # create an entry for the user to see the profit goal for the magic
             profit_entry = tk.Entry(
                 grid_frame,
+                textvariable=variables["profit"],
                 validate="key",
-                validatecommand=(
-                    self.filters_window.register(self.validate_float),
-                    "%P",
-                ),
+                validatecommand=validate_command,
             )
             # create a label for the loss goal
             loss_label = tk.Label(grid_frame, text="Loss Goal:", padx=10, pady=10)
             # create an entry for the user to see the loss goal for the magic
             loss_entry = tk.Entry(
                 grid_frame,
+                textvariable=variables["loss"],
                 validate="key",
-                validatecommand=(
-                    self.filters_window.register(self.validate_float),
-                    "%P",
-                ),
+                validatecommand=validate_command,
             )
-            # add the label and entry to their respective lists
-
-            checkboxes.append(checkbox)
-            checkboxes_states.append(variable)
-            labels.append(label)
-            entries.append((entry, profit_entry, loss_entry))
-
+            widgets = [
+                checkbox,
+                label,
+                entry,
+                profit_label,
+                profit_entry,
+                loss_label,
+                loss_entry,
+            ]
             # place the label and entry in the grid layout
-            checkbox.grid(row=i, column=0)
-            label.grid(row=i, column=1)
-            entry.grid(row=i, column=2)
-            profit_label.grid(row=i, column=3)
-            profit_entry.grid(row=i, column=4)
-            loss_label.grid(row=i, column=5)
-            loss_entry.grid(row=i, column=6)
-            # check if there is a data.txt file saved from the save_data function
-
-        data = self.read_data_file()
-        if data:
-            for checkbox, entry in zip(checkboxes, entries):
-                magic = checkbox.cget("text")
-                # get the data for the magic value
-                magic_data = data.get(magic, None)
-                # if there is data for the magic value
-                if magic_data:
-                    checkbox_state = magic_data.get("state", 0)
-                    checkbox.invoke() if checkbox_state else None
-                    alias_input, profit_input, loss_input = entry
-                    # set the alias input according to the alias field in the data
-                    alias = magic_data.get("alias", "")
-                    alias_input.insert(0, alias)
-                    # set the profit goal input according to the profit field in the data
-                    profit = magic_data.get("profit", "")
-                    profit_input.insert(0, profit)
-                    # set the loss goal input according to the loss field in the data
-                    loss = magic_data.get("loss", "")
-                    loss_input.insert(0, loss)
-        else:
-            for checkbox in checkboxes:
-                checkbox.invoke()
-            # set the alias input according to the alias field in the data
-            # create a frame for the buttons
+            for column, widget in enumerate(widgets):
+                widget.grid(row=i, column=column)
+            self.filter_widgets.append(
+                {"variables": variables, "widgets": widgets, "row": None}
+            )
+        # scroll the rows with the mouse wheel
+        self.filters_window.bind("<MouseWheel>", self.scroll_filters_wheel)
+        self.show_filter_rows()
+        # create a frame for the buttons
         button_frame = tk.Frame(self.filters_window)
         # create a button to cancel and close the window
         cancel_button = tk.Button(
@@ -407,7 +1057,8 @@ class GUI:
             button_frame,
             text="Save",
             command=lambda: [
-                self.save_data(checkboxes, entries, checkboxes_states),
+                self.store_filter_rows(),
+                self.save_data(self.filter_rows),
                 self.plot_data(),
                 self.clear_filters_window(),
             ],
@@ -418,9 +1069,80 @@ class GUI:
         cancel_button.pack(side=tk.LEFT, padx=10, pady=10)
         save_button.pack(side=tk.RIGHT, padx=10, pady=10)
         # place the frames in the window
-        grid_frame.pack()
+        search_frame.pack()
+        grid_frame.pack(side=tk.LEFT)
+        self.filters_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        list_frame.pack()
         button_frame.pack()
 
+    def store_filter_rows(self):
+        # keep what was typed in the visible rows before they show other magics
+        for widget_row in self.filter_widgets:
+            row = widget_row["row"]
+            if row is not None:
+                for field, variable in widget_row["variables"].items():
+                    row[field] = variable.get()
+
+    def show_filter_rows(self):
+        # show the magic numbers from the scroll offset in the reused rows
+        self.store_filter_rows()
+        for i, widget_row in enumerate(self.filter_widgets):
+            index = self.filter_offset + i
+            if index >= len(self.filter_matches):
+                widget_row["row"] = None
+                for widget in widget_row["widgets"]:
+                    widget.grid_remove()
+                continue
+            row = self.filter_matches[index]
+            widget_row["row"] = row
+            checkbox, label = widget_row["widgets"][:2]
+            checkbox.config(text=row["magic"])
+            label.config(text=row["info"])
+            for field, variable in widget_row["variables"].items():
+                variable.set(row[field])
+            for widget in widget_row["widgets"]:
+                widget.grid()
+        # move the scrollbar to the shown part of the list
+        total = max(len(self.filter_matches), 1)
+        self.filters_scrollbar.set(
+            self.filter_offset / total,
+            min(self.filter_offset + FILTER_ROWS, total) / total,
+        )
+
+    def scroll_filters(self, action, amount, unit=None):
+        # move the rows as the scrollbar asks for
+        if action == "moveto":
+            offset = int(float(amount) * len(self.filter_matches))
+        elif unit == "pages":
+            offset = self.filter_offset + int(amount) * FILTER_ROWS
+        else:
+            offset = self.filter_offset + int(amount)
+        self.set_filter_offset(offset)
+
+    def scroll_filters_wheel(self, event):
+        self.set_filter_offset(self.filter_offset - int(event.delta / 120) * 3)
+
+    def set_filter_offset(self, offset):
+        offset = max(0, min(offset, len(self.filter_matches) - FILTER_ROWS))
+        if offset != self.filter_offset:
+            self.filter_offset = offset
+            self.show_filter_rows()
+
+    def search_filters(self, text):
+        # show only the magic numbers or aliases containing the searched text
+        self.store_filter_rows()
+        text = text.strip().lower()
+        self.filter_matches = [
+            row
+            for row in self.filter_rows
+            if text in row["magic"] or text in row["alias"].lower()
+        ]
+        self.filter_offset = 0
+        # the rows were stored already, show the matches without storing again
+        for widget_row in self.filter_widgets:
+            widget_row["row"] = None
+        self.show_filter_rows()
+
     # define a function to show information about the project and the developer
     def show_information(self):
         self.info_window = tk.Toplevel()
@@ -499,6 +1221,12 @@ class GUI:
         linkedin_label.pack()
         linkedin_link.pack()
 
+    def close(self):
+        # disconnect from the terminal, if it was connected, and close the window
+        if self.mt5 is not None:
+            self.mt5.shutdown()
+        self.root.destroy()
+
     def center_window(self, window, w=None, h=None):
         # update the window to get the correct size
         window.update_idletasks()
@@ -521,30 +1249,19 @@ class GUI:
         window.geometry(f"{width}x{height}+{x}+{y}")
 
     # define a function to save the checkboxes and aliases to a file
-    def save_data(self, checkboxes, entries, states):
+    def save_data(self, rows):
         # create an empty dictionary to store the data
         data = {}
 
-        # loop through the checkboxes and entries
-        for checkbox, entry, state in zip(checkboxes, entries, states):
-            alias_input, profit_input, loss_input = entry
-
-            # get the value of the checkbox
-            magic = checkbox.cget("text")
-
-            # get the alias of the entry
-            alias = alias_input.get()
-            profit = profit_input.get()
-            loss = loss_input.get()
+        # loop through the settings of every magic number
+        for row in rows:
             # add the value and alias to the data dictionary
-            data[magic] = {
-                "alias": alias,
-                "profit": profit,
-                "loss": loss,
-                "state": int(state.get()),
+            data[row["magic"]] = {
+                "alias": row["alias"],
+                "profit": row["profit"],
+                "loss": row["loss"],
+                "state": int(row["state"]),
             }
 
-        # open a file for writing
-        with open("data.txt", "w") as f:
-            # write the data dictionary to the file
-            f.write(str(data))
+        # write the settings to the file, replacing the old one at once
+        self.settings.save(data)
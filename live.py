@@ -0,0 +1,110 @@
+# import the required modules
+import pandas as pd  # for data manipulation and analysis
+from datetime import datetime  # for the first day of the selected dates
+from pyramid import AggregatePyramid, group_profit  # for the aggregates
+from metrics import PerformanceMetrics  # for the metrics of the magic numbers
+from trades import TradeBuilder  # for joining the deals into trades
+from cube import BreakdownCube  # for the profit of every symbol of the magics
+
+
+# define a class for keeping the aggregates up to date as new deals arrive
+class LiveAggregate:
+    def __init__(
+        self,
+        mt5,
+        saved_data,
+        deals,
+        start_date,
+        end_date,
+        basis="Deals",
+        cancelled=None,
+    ):
+        self.mt5 = mt5  # the MT5 object for accessing the data
+        self.saved_data = saved_data  # the aliases, goals and states of the magics
+        self.start_date, self.end_date = start_date, end_date  # the selected dates
+        # remember the newest deal, the next polls only ask for newer ones
+        self.last_time = None
+        self.last_ticket = None
+        # count the round-trip trades instead of the deals, if asked for
+        self.trade_builder = TradeBuilder() if basis == "Trades" else None
+        # the drawdown, profit factor and win rate of every magic number
+        self.metrics = PerformanceMetrics()
+        # the daily profit of every magic number and symbol, for the drill-down,
+        # grouped the first time it is opened (see get_cube)
+        self.cube = None
+        # the deals can come as chunks in time order, each one is grouped and
+        # dropped before the next one is fetched, and the polls skip the cache too
+        self.cached = deals is None or isinstance(deals, pd.DataFrame)
+        if self.cached:
+            deals = [deals]
+        partials = []
+        for chunk in deals:
+            # stop fetching the next chunks once the caller does not need them
+            if cancelled is not None and cancelled():
+                break
+            chunk = self.add_deals(chunk)
+            if chunk is not None:
+                partials.append(group_profit(mt5, chunk))
+        # group the data by time and magic number at every resolution
+        self.pyramid = AggregatePyramid(mt5, saved_data, partials)
+
+    def add_deals(self, deals):
+        # filter the new deals and fold them into the metrics, None if none are left
+        if deals is None or len(deals) == 0:
+            return None
+        last_time, last_ticket = int(deals["time"].max()), int(deals["ticket"].max())
+        if self.last_time is not None:
+            last_time = max(self.last_time, last_time)
+            last_ticket = max(self.last_ticket, last_ticket)
+        self.last_time, self.last_ticket = last_time, last_ticket
+        deals = self.get_basis(self.mt5.get_filtered_deals(self.saved_data, deals))
+        if len(deals) == 0:
+            return None
+        with self.mt5.profiler.span("metrics"):
+            self.metrics.fold(deals)
+        if self.cube is not None:
+            self.cube.fold(deals)
+        return deals
+
+    def poll(self, end_datetime):
+        # fold the deals executed since the last poll into the aggregates
+        if self.last_time is None:
+            return False
+        deals = self.mt5.fetch_new_deals(
+            self.last_time, self.last_ticket, end_datetime, self.cached
+        )
+        deals = self.add_deals(deals)
+        if deals is None:
+            return False
+        self.pyramid.fold(deals)
+        return True
+
+    def get_cube(self):
+        # group the deals folded so far by symbol the first time the drill-down is
+        # opened, fetching them again; the polls keep it up to date after that
+        if self.cube is not None or self.last_time is None:
+            return self.cube
+        start_datetime = datetime.combine(self.start_date, datetime.min.time())
+        if self.cached:
+            deals = [self.mt5.fetch_data(start_datetime, self.last_time)]
+        else:
+            deals = self.mt5.stream_data(start_datetime, self.last_time)
+        cube = BreakdownCube(self.mt5)
+        trade_builder = TradeBuilder() if self.trade_builder is not None else None
+        for chunk in deals:
+            if chunk is None:
+                continue
+            chunk = chunk[chunk["ticket"] <= self.last_ticket]
+            chunk = self.mt5.get_filtered_deals(self.saved_data, chunk)
+            if trade_builder is not None:
+                chunk = trade_builder.fold(chunk)
+            cube.fold(chunk)
+        self.cube = cube
+        return cube
+
+    def get_basis(self, deals):
+        # the trades completed by the deals, or the deals themselves
+        if self.trade_builder is None:
+            return deals
+        with self.mt5.profiler.span("trades"):
+            return self.trade_builder.fold(deals)
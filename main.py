@@ -1,22 +1,245 @@
-# import the required modules
-import tkinter as tk  # for creating graphical user interface
-from gui import GUI
-from mt import MT5
+# import the required modules, the data modules are imported once they are needed
+# so the window can be shown before they are loaded
+import time  # for measuring the startup
+import argparse  # for parsing the command line options
+import cProfile  # for profiling a refresh
+import multiprocessing  # for the worker processes of the frozen executable
+from datetime import datetime, timedelta  # for the dates of the headless report
+from profiling import Profiler, format_record
 
 
-def main():
+def parse_args():
+    parser = argparse.ArgumentParser(description="Expert Statistics")
+    parser.add_argument(
+        "--record", metavar="FILE", help="record the terminal data to a file"
+    )
+    parser.add_argument(
+        "--replay", metavar="FILE", help="replay a recording instead of the terminal"
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=0,
+        help="replay the recorded deals this many times faster than real time",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="write the statistics to files instead of opening the window",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="serve the statistics as JSON and PNG charts over HTTP, refreshed on "
+        "a schedule and shared by every viewer",
+    )
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="the address the server listens on, only this computer by default",
+    )
+    parser.add_argument(
+        "--port", type=int, default=8050, help="the port the server listens on"
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=15,
+        help="the seconds between two refreshes of the served statistics",
+    )
+    parser.add_argument(
+        "--start",
+        type=datetime.fromisoformat,
+        default=datetime(year=2023, month=1, day=1),
+        help="the first date of the headless report (YYYY-MM-DD)",
+    )
+    parser.add_argument(
+        "--end",
+        type=datetime.fromisoformat,
+        help="the last date of the headless report (YYYY-MM-DD), today by default",
+    )
+    parser.add_argument(
+        "--output",
+        default="reports",
+        help="the directory the headless report is written to",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["csv", "parquet"],
+        default="csv",
+        help="the file format of the headless report tables",
+    )
+    parser.add_argument(
+        "--basis",
+        choices=["deals", "trades"],
+        default="deals",
+        help="count the deals or the round-trip trades in the headless report",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="fetch and group the deals of the headless report a month at a time, "
+        "bypassing the deals cache, to bound the memory on long histories",
+    )
+    parser.add_argument(
+        "--terminal",
+        action="append",
+        metavar="PATH",
+        help="aggregate this terminal (or recording) in a worker process, repeat it "
+        "to combine the accounts of many terminals in the headless report",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="write a cProfile capture of the first refresh to a file",
+    )
+    parser.add_argument(
+        "--timings-log",
+        metavar="FILE",
+        help="add the timings of every refresh to a JSON-lines file",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="measure the peak memory of every refresh (makes refreshes slower)",
+    )
+    parser.add_argument(
+        "--no-charts",
+        action="store_true",
+        help="do not draw the charts of the headless report",
+    )
+    return parser.parse_args()
+
+
+def create_backend(args):
+    from backend import LiveBackend, RecordingBackend, ReplayBackend
+
+    # choose where the data comes from
+    if args.replay:
+        return ReplayBackend(args.replay, speed=args.speed)
+    if args.record:
+        return RecordingBackend(LiveBackend(), args.record)
+    return LiveBackend()
+
+
+def create_mt5(args):
+    from mt import MT5
+
+    # replayed deals may trickle in, so they are not mixed into the deals cache
+    return MT5(
+        create_backend(args),
+        use_cache=not args.replay,
+        profiler=Profiler(args.timings_log, args.trace_memory),
+    )
+
+
+def get_end_datetime(args):
+    end_datetime = datetime.now()
+    if args.end:
+        # include the whole last day
+        end_datetime = min(end_datetime, args.end + timedelta(days=1))
+    return end_datetime
+
+
+def run_accounts(args):
+    # combine the accounts of many terminals, each aggregated in its own process
+    import os
+    from accounts import AccountsAggregate
+    from report import write_table
+    from settings import SettingsStore
+
+    accounts = AccountsAggregate(
+        args.terminal, SettingsStore().load(), basis=args.basis.capitalize()
+    )
+    summary, daily = accounts.run(args.start, get_end_datetime(args))
+    if summary is None:
+        return 1
+    directory = os.path.join(args.output, "combined")
+    os.makedirs(directory, exist_ok=True)
+    print(write_table(summary, directory, "summary", args.format))
+    print(write_table(daily, directory, "daily", args.format))
+    return 0
+
+
+def run_headless(args, mt5):
+    # only the report modules are imported, the GUI toolkit is never loaded
+    from report import Report
+    from settings import SettingsStore
+
+    end_datetime = get_end_datetime(args)
+    report = Report(
+        mt5,
+        args.output,
+        args.format,
+        charts=not args.no_charts,
+        basis=args.basis.capitalize(),
+        stream=args.stream,
+    )
+    mt5.profiler.start()
+    profile = cProfile.Profile() if args.profile else None
+    if profile:
+        profile.enable()
+    paths = report.run(SettingsStore().load(), args.start, end_datetime)
+    if profile:
+        profile.disable()
+        profile.dump_stats(args.profile)
+    print(format_record(mt5.profiler.finish()))
+    for path in paths:
+        print(path)
+    mt5.shutdown()
+    return 0 if paths else 1
+
+
+def run_server(args, mt5):
+    # only the server and report modules are imported, the GUI toolkit is never loaded
+    from server import Dashboard, serve
+    from settings import SettingsStore
+
+    dashboard = Dashboard(
+        mt5,
+        SettingsStore(),
+        args.start,
+        basis=args.basis.capitalize(),
+        stream=args.stream,
+        charts=not args.no_charts,
+        interval=args.interval,
+    )
+    serve(dashboard, args.host, args.port)
+    mt5.shutdown()
+    return 0
+
+
+def run_gui(args, started):
+    import tkinter as tk  # for creating graphical user interface
+    from gui import GUI
+
     root = tk.Tk()
-    mt5 = MT5()
     # Set the geometry of frame
     w, h = root.winfo_screenwidth(), root.winfo_screenheight()
     root.state("zoomed")
 
-    ui = GUI(root, mt5)
+    # the terminal is connected in the background once the window is shown, the
+    # first refresh starts when it is
+    ui = GUI(root, lambda: create_mt5(args), args.profile, started)
     ui.center_window(root, w=w, h=h)
-    root.protocol("WM_DELETE_WINDOW", lambda: [mt5.shutdown(), root.destroy()])
-    ui.plot_data()
+    root.protocol("WM_DELETE_WINDOW", ui.close)
     root.mainloop()  # start the main loop of the GUI
 
 
+def main():
+    started = time.perf_counter()
+    args = parse_args()
+    if args.terminal:
+        return run_accounts(args)
+    if args.headless:
+        return run_headless(args, create_mt5(args))
+    if args.serve:
+        return run_server(args, create_mt5(args))
+    return run_gui(args, started)
+
+
 if __name__ == "__main__":
-    main()
+    # the worker processes of --terminal re-run the executable built by pyinstaller,
+    # they have to stop here before the options are parsed
+    multiprocessing.freeze_support()
+    raise SystemExit(main())
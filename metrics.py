@@ -0,0 +1,179 @@
+# import the required modules
+import numpy as np  # for the cumulative calculations over the groups
+import pandas as pd  # for data manipulation and analysis
+from pyramid import FINEST_RESOLUTION, to_buckets  # for the buckets of the curve
+
+# the totals kept for every magic number, the metrics are derived from them
+METRIC_STATE = [
+    "trades",
+    "wins",
+    "losses",
+    "gross_profit",
+    "gross_loss",
+    "sum_squares",
+    "equity",
+    "peak",
+    "max_drawdown",
+]
+# the metrics of every magic number
+METRIC_COLUMNS = [
+    "trades",
+    "win_rate",
+    "profit_factor",
+    "avg_win",
+    "avg_loss",
+    "max_drawdown",
+    "sharpe",
+]
+
+
+def empty_curve():
+    # the equity and drawdown of every bucket and magic number, without any bucket
+    return pd.DataFrame(
+        {"equity": pd.Series(dtype="float64"), "drawdown": pd.Series(dtype="float64")},
+        index=pd.MultiIndex.from_arrays(
+            [pd.DatetimeIndex([]), pd.Index([], dtype="int64")],
+            names=["time", "magic"],
+        ),
+    )
+
+
+def roll_up_curve(curve, times):
+    # the equity at the end of every bucket and the deepest drawdown within it, the
+    # curve being sorted by time
+    curve = curve.groupby([times, curve.index.get_level_values("magic")]).agg(
+        {"equity": "last", "drawdown": "max"}
+    )
+    curve.index.names = ["time", "magic"]
+    return curve
+
+
+def get_trades(deals):
+    # the deals closing a buy or sell position, the ones with a profit or loss
+    trades = deals
+    if "type" in deals:
+        trades = trades[trades["type"].to_numpy() <= 1]
+    if "entry" in deals:
+        trades = trades[trades["entry"].to_numpy() != 0]
+    return trades
+
+
+def group_max(values, groups, initial):
+    # the running maximum of the values within every group, starting from the
+    # initial value of the group: shifting every group above the previous ones
+    # lets one cumulative maximum run over all of them
+    low = min(values.min(), initial.min())
+    height = max(values.max(), initial.max()) - low + 1
+    shift = groups * height
+    shifted = np.maximum(values, initial[groups]) - low + shift
+    return np.maximum.accumulate(shifted) + low - shift
+
+
+# define a class for the performance metrics of every magic number, updated with
+# the new deals as they arrive
+class PerformanceMetrics:
+    def __init__(self):
+        self.state = pd.DataFrame(
+            {column: pd.Series(dtype="float64") for column in METRIC_STATE},
+            index=pd.Index([], dtype="int64", name="magic"),
+        )
+        # the equity curve of the trades at the finest resolution, the Equity and
+        # Drawdown tabs show it so they agree with the maximum drawdown
+        self.curve = empty_curve()
+
+    def fold(self, deals):
+        # add deals newer than the ones already folded, sorted once by magic and time
+        trades = get_trades(deals)
+        if len(trades) == 0:
+            return
+        magic = trades["magic"].to_numpy()
+        order = np.lexsort((trades["time"].to_numpy(), magic))
+        magic = magic[order]
+        profit = trades["profit"].to_numpy(dtype="float64")[order]
+        magics, starts, counts = np.unique(magic, return_index=True, return_counts=True)
+        ends = starts + counts - 1
+        groups = np.repeat(np.arange(len(magics)), counts)
+        # continue from the totals of the deals folded before
+        previous = self.state.reindex(magics, fill_value=0)
+        wins = profit > 0
+        losses = profit < 0
+        # the equity of every magic number after each deal
+        total = np.cumsum(profit)
+        equity = (
+            total
+            - np.repeat(total[starts] - profit[starts], counts)
+            + previous["equity"].to_numpy()[groups]
+        )
+        peak = group_max(equity, groups, previous["peak"].to_numpy())
+        new = pd.DataFrame(
+            {
+                "trades": counts,
+                "wins": np.add.reduceat(wins, starts),
+                "losses": np.add.reduceat(losses, starts),
+                "gross_profit": np.add.reduceat(np.where(wins, profit, 0), starts),
+                "gross_loss": np.add.reduceat(np.where(losses, -profit, 0), starts),
+                "sum_squares": np.add.reduceat(profit**2, starts),
+            },
+            index=pd.Index(magics, name="magic"),
+        ).astype("float64")
+        new += previous[new.columns].to_numpy()
+        new["equity"] = equity[ends]
+        new["peak"] = peak[ends]
+        new["max_drawdown"] = np.maximum(
+            previous["max_drawdown"].to_numpy(),
+            np.maximum.reduceat(peak - equity, starts),
+        )
+        self.state = pd.concat(
+            [self.state[~self.state.index.isin(magics)], new]
+        ).sort_index()
+        times = trades["time"]
+        if not pd.api.types.is_datetime64_any_dtype(times):
+            times = pd.to_datetime(times.to_numpy(), unit="s")
+        times = to_buckets(pd.DatetimeIndex(times)[order], FINEST_RESOLUTION)
+        points = pd.DataFrame(
+            {"equity": equity, "drawdown": peak - equity},
+            index=pd.MultiIndex.from_arrays([times, magic], names=["time", "magic"]),
+        )
+        self.merge_curve(roll_up_curve(points, times))
+
+    def merge_curve(self, new_curve):
+        # the new deals can only continue the last bucket of a magic number, its
+        # equity is replaced and its drawdown is the deeper one
+        curve = self.curve
+        existing = new_curve.index.isin(curve.index)
+        if existing.any():
+            updated = new_curve.index[existing]
+            new_curve.loc[updated, "drawdown"] = np.maximum(
+                new_curve.loc[updated, "drawdown"].to_numpy(),
+                curve.loc[updated, "drawdown"].to_numpy(),
+            )
+            curve = curve.drop(updated)
+        self.curve = pd.concat([curve, new_curve]).sort_index()
+
+    def get_curve(self, resolution):
+        # the equity at the end of every bucket of the resolution and the deepest
+        # drawdown within it
+        if resolution == FINEST_RESOLUTION:
+            return self.curve
+        times = to_buckets(self.curve.index.get_level_values("time"), resolution)
+        return roll_up_curve(self.curve, times)
+
+    def get_table(self):
+        # derive the metrics of every magic number from its totals
+        state = self.state
+        trades = state["trades"]
+        mean = state["equity"] / trades
+        variance = (state["sum_squares"] - trades * mean**2) / (trades - 1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return pd.DataFrame(
+                {
+                    "trades": trades.astype("int64"),
+                    "win_rate": state["wins"] / trades,
+                    "profit_factor": state["gross_profit"] / state["gross_loss"],
+                    "avg_win": state["gross_profit"] / state["wins"],
+                    "avg_loss": -state["gross_loss"] / state["losses"],
+                    "max_drawdown": state["max_drawdown"],
+                    # the mean profit of a trade over its standard deviation
+                    "sharpe": mean / np.sqrt(variance.clip(lower=0)),
+                }
+            ).replace([np.inf, -np.inf], np.nan)
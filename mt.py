@@ -1,163 +1,293 @@
 # import the required modules
-import MetaTrader5 as mt5  # for accessing MetaTrader 5 terminal data
+import numpy as np  # for vectorized calculations
 import pandas as pd  # for data manipulation and analysis
 from datetime import datetime, date  # for working with dates and times
+from operator import itemgetter  # for picking the used fields of the deals
 from pandas.core.groupby.generic import DataFrameGroupBy
-import re
+from cache import DealCache, index_magics, to_timestamp  # for the deals on disk
+from backend import LiveBackend  # for accessing MetaTrader 5 terminal data
+from aggregate import AggregateResult  # for the statistics shown after a refresh
+from settings import Settings  # for the typed goals and states of the magics
+from profiling import Profiler  # for timing the stages of a refresh
+from positions import PositionTracker  # for the open positions of the magics
+from connection import ConnectionSupervisor  # for the status of the terminal
+
+# the types of the number fields of the deals returned by the terminal
+DEAL_DTYPES = {
+    "ticket": "int64",
+    "order": "int64",
+    "time": "int64",
+    "time_msc": "int64",
+    "type": "int32",
+    "entry": "int32",
+    "magic": "int64",
+    "position_id": "int64",
+    "reason": "int32",
+    "volume": "float64",
+    "price": "float64",
+}
+# the money fields, stored as float64 unless a smaller type is asked for
+MONEY_FIELDS = ["commission", "swap", "profit", "fee"]
+# the deal columns the statistics use
+DEAL_COLUMNS = [
+    "ticket",
+    "time",
+    "type",
+    "entry",
+    "magic",
+    "position_id",
+    "volume",
+    "commission",
+    "swap",
+    "profit",
+    "fee",
+    "symbol",
+]
 
 
 # define a class for accessing the MetaTrader 5 terminal data
 class MT5:
-    def __init__(self):
+    def __init__(
+        self, backend=None, use_cache=True, money_dtype="float64", profiler=None
+    ):
+        # the data source, a running terminal unless a recording is replayed
+        self.backend = backend if backend != None else LiveBackend()
+        self.use_cache = use_cache  # whether deals are kept in the on-disk cache
+        self.money_dtype = money_dtype  # use "float32" to halve the money columns
+        self.cache = None  # the deals cache of the logged in account
+        self.cache_key = None  # the account and server the cache belongs to
+        # the timings of the stages of a refresh
+        self.profiler = profiler if profiler != None else Profiler()
         # establish connection to the MetaTrader 5 terminal
         self.initialize()
+        # the cached status of the connection, restored in the background if lost
+        self.connection = ConnectionSupervisor(self)
 
     def initialize(self):
-        if not mt5.initialize():
-            print("initialize() failed, error code =", mt5.last_error())
+        if not self.backend.initialize():
+            print("initialize() failed, error code =", self.backend.last_error())
 
-    def fetch_data(self, start_datetime, end_datetime):
+    def get_cache(self):
+        # get the deals cache of the logged in account, or None if unknown
+        if not self.use_cache:
+            return None
+        account_info = self.backend.account_info()
+        if account_info == None:
+            return None
+        key = (account_info.login, account_info.server)
+        if self.cache == None or self.cache_key != key:
+            self.cache = DealCache(*key)
+            self.cache_key = key
+        return self.cache
+
+    def fetch_history(self, start_datetime, end_datetime):
         # get the history deals from MetaTrader 5 terminal within the selected dates
-        deals = mt5.history_deals_get(start_datetime, end_datetime)
-        # check if there are any deals found
+        with self.profiler.span("fetch"):
+            deals = self.backend.history_deals_get(start_datetime, end_datetime)
         if deals == None or len(deals) == 0:
+            if not self.backend.last_error()[0] == 1:
+                print("error code={}".format(self.backend.last_error()))
+            return None
+        print(
+            "history_deals_get({}, {},)={}".format(
+                start_datetime, end_datetime, len(deals)
+            )
+        )
+        with self.profiler.span("convert"):
+            return self.convert_data_to_dataframe(deals)
+
+    def fetch_data(self, start_datetime, end_datetime):
+        # serve the deals from the cache, fetching only what it does not hold yet
+        cache = self.get_cache()
+        if cache == None:
+            deals = self.fetch_history(start_datetime, end_datetime)
+        else:
+            cache.update(self.fetch_history, start_datetime, end_datetime)
+            with self.profiler.span("cache"):
+                deals = cache.get_range(start_datetime, end_datetime)
+        # check if there are any deals found
+        if deals is None or len(deals) == 0:
             print("No deals found")
-            if not mt5.last_error()[0] == 1:
-                print("error code={}".format(mt5.last_error()))
             return None  # return None if no data is found
-        elif len(deals) > 0:
-            print(
-                "history_deals_get({}, {},)={}".format(
-                    start_datetime, end_datetime, len(deals)
-                )
-            )
-            return deals  # return the deals data if found
+        self.profiler.count("deals", len(deals))
+        return deals  # return the deals data if found
+
+    def get_cached_data(self, start_datetime, end_datetime):
+        # serve the deals the cache already holds without asking the terminal, e.g.
+        # while it is disconnected
+        if self.cache == None:
+            return None
+        return self.cache.get_range(start_datetime, end_datetime)
+
+    def stream_data(self, start_datetime, end_datetime, freq="MS"):
+        # fetch the deals one time window at a time (monthly by default), so only
+        # one window of raw deals is held at once; the cache is bypassed as it
+        # would keep the whole range in memory
+        start, end = to_timestamp(start_datetime), to_timestamp(end_datetime)
+        bounds = pd.date_range(
+            pd.Timestamp(start, unit="s").normalize(),
+            pd.Timestamp(end, unit="s"),
+            freq=freq,
+        )
+        bounds = [to_timestamp(bound) for bound in bounds.to_pydatetime()]
+        bounds = [start] + [bound for bound in bounds if start < bound <= end] + [end]
+        total = 0
+        for i, (window_start, window_end) in enumerate(zip(bounds, bounds[1:])):
+            deals = self.fetch_history(window_start, window_end)
+            if deals is None:
+                continue
+            # the terminal includes both bounds, a deal on a boundary belongs to
+            # the next window, except at the end of the range
+            if i < len(bounds) - 2:
+                deals = deals[deals["time"].to_numpy() < window_end]
+            if len(deals) > 0:
+                total += len(deals)
+                self.profiler.count("deals", total)
+                yield deals
+
+    def get_magic_index(self):
+        # get the first and last deal time and the deal count of every magic number,
+        # the cache keeps them up to date with the deals fetched since the last call
+        cache = self.get_cache()
+        if cache == None:
+            return index_magics(self.fetch_history(0, datetime.now()))
+        cache.update(self.fetch_history, 0, datetime.now())
+        return cache.magics
 
-    def convert_data_to_dataframe(self, deals):
-        # convert the deals to a pandas dataframe
-        deals = pd.DataFrame(list(deals), columns=deals[0]._asdict())
+    def convert_data_to_dataframe(self, deals, money_dtype=None):
+        # deals served from the cache are already a dataframe
+        if isinstance(deals, pd.DataFrame):
+            return deals[[column for column in DEAL_COLUMNS if column in deals]]
+        money_dtype = money_dtype or self.money_dtype
+        # only the columns the statistics use are copied, the other fields (e.g.
+        # the comment) are never materialized
+        fields = deals[0]._fields
+        numbers = [
+            column
+            for column in DEAL_COLUMNS
+            if column in fields and (column in MONEY_FIELDS or column in DEAL_DTYPES)
+        ]
+        strings = [
+            column
+            for column in DEAL_COLUMNS
+            if column in fields and column not in numbers
+        ]
+        # copy the numbers straight into a structured array with compact types
+        dtype = [
+            (field, money_dtype if field in MONEY_FIELDS else DEAL_DTYPES[field])
+            for field in numbers
+        ]
+        get_numbers = itemgetter(*[fields.index(field) for field in numbers])
+        array = np.fromiter(map(get_numbers, deals), dtype=dtype, count=len(deals))
+        columns = {column: array[column] for column in numbers}
+        # the strings (the symbol) are stored as categories
+        for column in strings:
+            index = fields.index(column)
+            columns[column] = pd.Categorical([deal[index] for deal in deals])
+        deals = pd.DataFrame(columns)
         return deals  # return the dataframe
 
-    def group_data_by_time_and_magic(self, deals: pd.DataFrame):
+    def group_data_by_time_and_magic(self, deals: pd.DataFrame, freq="D", by=()):
         # convert the time column to datetime format
         deals["time"] = pd.to_datetime(deals["time"], unit="s")
-        # group the data by time and magic number and sum up the profit values
-        filtered_data = deals.groupby([pd.Grouper(key="time", freq="D"), "magic"])
+        # group the data by time and magic number (and the columns in by, e.g. the
+        # symbol) and sum up the profit values; only the combinations that occur
+        # are kept, the categories of a categorical column are not multiplied out
+        filtered_data = deals.groupby(
+            [pd.Grouper(key="time", freq=freq), "magic", *by], observed=True
+        )
         return filtered_data  # return the grouped data
 
-    def get_positions(self, start_date, deals):
-        # get the positions from MetaTrader 5 terminal
-        positions = mt5.positions_get()
-        if positions == None or len(positions) == 0:
-            print("No positions found")
-            positions_count = {}
-            for magic_number, row in deals.iterrows():
-                positions_count[magic_number] = 0
-            return positions_count
-        # filter positions by start date and group by magic number
-        positions_df = pd.DataFrame(list(positions), columns=positions[0]._asdict())
-        positions_df["time"] = pd.to_datetime(positions_df["time"], unit="s")
-        start_datetime = datetime.combine(start_date, datetime.min.time())
-        filtered_positions = positions_df[positions_df["time"] >= start_datetime]
-        # count the number of positions for each magic number
-        positions_count = filtered_positions.groupby("magic").size()
-        return positions_count.to_dict()
+    def get_positions(self, start_date, deals=None):
+        # get the count, volume, floating profit and swap of the positions opened
+        # since the start date for each magic number
+        tracker = PositionTracker(self, start_date)
+        tracker.poll()
+        return tracker.totals
+
+    def is_connected(self):
+        # ask the terminal once whether it is connected
+        terminal_info = self.backend.terminal_info()
+        return terminal_info != None and bool(terminal_info._asdict()["connected"])
 
     def get_connection(self):
-        terminal_info = mt5.terminal_info()
+        if self.is_connected():
+            return True, self.get_connection_string("CONNECTED")
+        return False, self.get_connection_string("DISCONNECTED")
+
+    def get_connection_string(self, status):
         update_time_string = " - Last Update: {}".format(
             datetime.now().strftime("%d/%m/%y %H:%M:%S")
         )
-        if terminal_info != None:
-            terminal_info_dict = mt5.terminal_info()._asdict()
-            connection_status = terminal_info_dict["connected"]
-            if connection_status:
-                return True, "Expert Statistics (CONNECTED)" + update_time_string
-        return False, "Expert Statistics (DISCONNECTED)" + update_time_string
+        return f"Expert Statistics ({status})" + update_time_string
 
     def shutdown(self):
-        return mt5.shutdown()
+        self.connection.stop()
+        return self.backend.shutdown()
 
-    def get_plot_data(
-        self, saved_data, tabs_list: list[str], filtered_data
-    ) -> list[tuple[pd.Series]]:
+    def aggregate_profit(self, saved_data, filtered_data):
+        # sum up and count the profit of each time and magic number in one pass
+        daily = filtered_data["profit"].agg(["sum", "count"])
+        daily["reached_goal"], daily["goal_status"] = self.classify_goals(
+            saved_data, daily["sum"]
+        )
+        return daily
+
+    def classify_goals(self, saved_data, daily_profit):
         data = saved_data
         if not data:
             data = {}
-        return [
-            (0, tabs_list[0], filtered_data["profit"].sum()),
-            (1, tabs_list[1], filtered_data["profit"].mean()),
-            # add a third plot for the profit goal
-            (
-                2,
-                tabs_list[2],
-                filtered_data["profit"]
-                .sum()
-                .groupby("magic")
-                .apply(
-                    lambda x: x.apply(
-                        lambda y: 1
-                        if y >= float(self.get_value_by_regex(data, x.name, "profit"))
-                        else -1
-                        if y <= float(self.get_value_by_regex(data, x.name, "loss"))
-                        else 0
-                    )
-                ),
-            ),
-            (
-                3,
-                tabs_list[3],
-                filtered_data["profit"]
-                .sum()
-                .groupby("magic")
-                .apply(
-                    lambda x: x.apply(
-                        lambda y: 2
-                        if y >= float(self.get_value_by_regex(data, x.name, "profit"))
-                        else 1
-                        if y > 0
-                        else 0
-                        if y == 0
-                        else -2
-                        if y <= float(self.get_value_by_regex(data, x.name, "loss"))
-                        else -1
-                    )
-                ),
-            ),
-        ]
+        profit = daily_profit.to_numpy()
+        profit_goal, loss_goal = self.get_goal_thresholds(
+            data, daily_profit.index.get_level_values("magic")
+        )
+        # classify every day against the goals of its magic number in one pass
+        reached_goal = np.select(
+            [profit >= profit_goal, profit <= loss_goal], [1, -1], 0
+        )
+        goal_status = np.select(
+            [profit >= profit_goal, profit > 0, profit == 0, profit <= loss_goal],
+            [2, 1, 0, -2],
+            -1,
+        )
+        return reached_goal, goal_status
 
-    def get_value_by_regex(self, data, magic_str, field):
-        if isinstance(magic_str, int):
-            magic = magic_str
+    def get_plot_data(
+        self, saved_data, tabs_list: list[str], filtered_data
+    ) -> list[tuple[pd.Series]]:
+        daily = self.aggregate_profit(saved_data, filtered_data)
+        return AggregateResult(tabs_list, daily).plot_data
+
+    def fetch_new_deals(self, last_time, last_ticket, end_datetime, cached=True):
+        # get only the deals newer than the last seen ticket
+        if cached:
+            deals = self.fetch_data(last_time, end_datetime)
         else:
-            magic = re.findall(r"\((.*?)\)", str(magic_str))
-            if len(magic) > 0:
-                magic = magic[0]
-            else:
-                return 0
-
-        value = data.get(str(magic))
-        if value:
-            value = value.get(field, 0)
-        if not value:
-            return 0
-        return value
+            deals = self.fetch_history(last_time, end_datetime)
+        if deals is None:
+            return None
+        deals = deals[deals["ticket"] > last_ticket]
+        if len(deals) == 0:
+            return None
+        return deals
 
-    def get_filtered_deals(self, saved_data, deals):
-        # convert the data to a dataframe
-        deals = self.convert_data_to_dataframe(deals)
+    def get_goal_thresholds(self, data, magics):
+        # look up the goals typed once when the settings were read, as arrays
+        # aligned with the magic numbers
+        return Settings.of(data).goal_thresholds(magics)
+
+    def get_magic_label(self, saved_data, magic):
+        # show the magic number with its alias in the format of {alias} - ({magic})
         if saved_data:
-            # replace the magic field with the alias and magic number in the format of {alias} - ({magic})
-            deals["magic"] = deals["magic"].apply(
-                lambda x: f"{saved_data.get(str(x), {}).get('alias', '')} - ({x})"
-            )
-            # filter out the deals that have a state of 0 in the data.txt file
-            deals = deals[
-                deals["magic"].apply(
-                    lambda x: saved_data.get(x.split(" - ")[-1][1:-1], {}).get(
-                        "state", 1
-                    )
-                    == 1
-                )
-            ]
+            return f"{saved_data.get(str(magic), {}).get('alias', '')} - ({magic})"
+        return magic
+
+    def get_filtered_deals(self, saved_data, deals):
+        with self.profiler.span("filter"):
+            # convert the data to a dataframe
+            deals = self.convert_data_to_dataframe(deals)
+            if saved_data:
+                # filter out the deals that have a state of 0 in the settings
+                disabled_magics = Settings.of(saved_data).disabled_magics()
+                deals = deals[~deals["magic"].isin(disabled_magics)]
         return deals
@@ -0,0 +1,100 @@
+# import the required modules
+import numpy as np  # for comparing the snapshots
+import pandas as pd  # for data manipulation and analysis
+from cache import to_timestamp  # for comparing the opening times
+
+# the position fields the tracker keeps, by ticket
+POSITION_FIELDS = ["time", "magic", "volume", "profit", "swap"]
+# the totals of the open positions of every magic number
+POSITION_TOTALS = ["positions", "volume", "floating_profit", "swap"]
+
+
+def empty_positions():
+    # the positions by ticket with the types of their fields, without any positions
+    return pd.DataFrame(
+        {
+            "time": pd.Series(dtype="int64"),
+            "magic": pd.Series(dtype="int64"),
+            "volume": pd.Series(dtype="float64"),
+            "profit": pd.Series(dtype="float64"),
+            "swap": pd.Series(dtype="float64"),
+        },
+        index=pd.Index([], dtype="int64", name="ticket"),
+    )
+
+
+def summarize_positions(positions):
+    # add up the open positions of every magic number in one pass
+    totals = positions.groupby("magic").agg(
+        positions=("volume", "size"),
+        volume=("volume", "sum"),
+        floating_profit=("profit", "sum"),
+        swap=("swap", "sum"),
+    )
+    return totals.astype({"positions": "int64"})
+
+
+# define a class for keeping the open positions up to date between polls
+class PositionTracker:
+    def __init__(self, mt5, start_date=0):
+        self.mt5 = mt5  # the MT5 object for accessing the terminal
+        self.start_time = to_timestamp(start_date)  # only positions opened since
+        self.positions = empty_positions()  # the last snapshot of the positions
+        self.totals = summarize_positions(self.positions)
+
+    def set_start_date(self, start_date):
+        # count the positions opened since another date
+        start_time = to_timestamp(start_date)
+        if start_time != self.start_time:
+            self.start_time = start_time
+            self.totals = summarize_positions(self.get_open_positions())
+
+    def get_open_positions(self):
+        return self.positions[self.positions["time"] >= self.start_time]
+
+    def get_snapshot(self):
+        # get the open positions from the terminal, None if they could not be read
+        positions = self.mt5.backend.positions_get()
+        if positions == None:
+            return None
+        if len(positions) == 0:
+            return self.positions.iloc[:0]
+        fields = positions[0]._fields
+        columns = [fields.index(field) for field in ["ticket"] + POSITION_FIELDS]
+        snapshot = pd.DataFrame(
+            [[position[i] for i in columns] for position in positions],
+            columns=["ticket"] + POSITION_FIELDS,
+        )
+        return snapshot.set_index("ticket").astype(self.positions.dtypes.to_dict())
+
+    def poll(self):
+        # apply the positions opened, closed or changed since the last poll and
+        # update the totals of their magic numbers, True if anything changed
+        snapshot = self.get_snapshot()
+        if snapshot is None:
+            return False
+        old = self.positions
+        opened = snapshot.index.difference(old.index)
+        closed = old.index.difference(snapshot.index)
+        common = snapshot.index.intersection(old.index)
+        changed = common[
+            np.any(
+                snapshot.loc[common, POSITION_FIELDS].to_numpy()
+                != old.loc[common, POSITION_FIELDS].to_numpy(),
+                axis=1,
+            )
+        ]
+        if len(opened) == 0 and len(closed) == 0 and len(changed) == 0:
+            return False
+        # the magic numbers whose totals are affected, before and after the poll
+        magics = np.union1d(
+            snapshot.loc[opened.union(changed), "magic"].to_numpy(),
+            old.loc[closed.union(changed), "magic"].to_numpy(),
+        )
+        self.positions = snapshot
+        positions = self.get_open_positions()
+        totals = summarize_positions(positions[positions["magic"].isin(magics)])
+        self.totals = pd.concat(
+            [self.totals[~self.totals.index.isin(magics)], totals]
+        ).sort_index()
+        return True
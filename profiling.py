@@ -0,0 +1,68 @@
+# import the required modules
+import json  # for the timings log
+import time  # for timing the stages
+import tracemalloc  # for the peak memory of a refresh
+from contextlib import contextmanager  # for the timing spans
+
+
+# define a class for timing the stages of a refresh
+class Profiler:
+    def __init__(self, log_path=None, trace_memory=False):
+        self.log_path = log_path  # the JSON-lines file the timings are added to
+        self.trace_memory = trace_memory  # tracing the memory slows down a refresh
+        self.record = None  # the timings and counts of the running refresh
+
+    def start(self):
+        # start measuring a new refresh
+        self.record = {"spans": {}, "counts": {}, "started": time.perf_counter()}
+        if self.trace_memory:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+
+    @contextmanager
+    def span(self, name):
+        # add the time spent in the block to the stage, spans of the same name add up
+        record = self.record
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if record is not None:
+                spans = record["spans"]
+                spans[name] = spans.get(name, 0) + time.perf_counter() - start
+
+    def count(self, name, value):
+        if self.record is not None:
+            self.record["counts"][name] = int(value)
+
+    def finish(self):
+        # stop measuring and return the record, also added to the log if there is one
+        record, self.record = self.record, None
+        if record is None:
+            return None
+        record["total"] = time.perf_counter() - record.pop("started")
+        if self.trace_memory and tracemalloc.is_tracing():
+            record["peak_memory"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        self.write(record)
+        return record
+
+    def write(self, record):
+        # add a record to the log, if there is one
+        if self.log_path:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"time": time.time(), **record}) + "\n")
+
+
+def format_record(record):
+    # show the record as a short text, e.g. for the title bar
+    if not record:
+        return ""
+    parts = [f"{name} {seconds:.2f}s" for name, seconds in record["spans"].items()]
+    parts.append(f"total {record['total']:.2f}s")
+    parts += [f"{value} {name}" for name, value in record["counts"].items()]
+    if "peak_memory" in record:
+        parts.append(f"peak {record['peak_memory'] / 2**20:.1f} MB")
+    return ", ".join(parts)
@@ -0,0 +1,132 @@
+# import the required modules
+import numpy as np  # for vectorized calculations
+import pandas as pd  # for data manipulation and analysis
+
+
+# the time resolutions the profit can be grouped by and their pandas frequencies
+RESOLUTIONS = {"Hour": "H", "Day": "D", "Week": "W", "Month": "M"}
+# the finest resolution, the coarser ones are rolled up from it
+FINEST_RESOLUTION = "Hour"
+# the most points drawn for each line, longer lines are downsampled
+MAX_PLOT_POINTS = 1000
+
+
+def to_buckets(times, resolution):
+    # get the start of the hour, day, week or month of every time
+    freq = RESOLUTIONS[resolution]
+    if resolution in ("Hour", "Day"):
+        return times.floor(freq)
+    return times.to_period(freq).start_time
+
+
+def group_profit(mt5, deals):
+    # add up and count the profit of the deals at the finest resolution
+    with mt5.profiler.span("group"):
+        filtered_data = mt5.group_data_by_time_and_magic(
+            deals, RESOLUTIONS[FINEST_RESOLUTION]
+        )
+        return filtered_data["profit"].agg(["sum", "count"])
+
+
+# define a class for keeping the profit aggregates at every time resolution
+class AggregatePyramid:
+    def __init__(self, mt5, saved_data, partials):
+        self.mt5 = mt5  # the MT5 object for classifying the goals
+        self.saved_data = saved_data  # the aliases, goals and states of the magics
+        # join the finest sums of the chunks of deals, then classify them once
+        with mt5.profiler.span("group"):
+            if len(partials) == 1:
+                finest = partials[0].copy()
+            elif partials:
+                finest = pd.concat(partials).groupby(level=["time", "magic"]).sum()
+            else:
+                finest = pd.DataFrame(
+                    {
+                        "sum": pd.Series(dtype="float64"),
+                        "count": pd.Series(dtype="int64"),
+                    },
+                    index=pd.MultiIndex.from_arrays(
+                        [pd.DatetimeIndex([]), pd.Index([], dtype="int64")],
+                        names=["time", "magic"],
+                    ),
+                )
+            finest["reached_goal"], finest["goal_status"] = mt5.classify_goals(
+                saved_data, finest["sum"]
+            )
+            self.levels = {FINEST_RESOLUTION: finest}
+
+    def get(self, resolution):
+        # roll the coarser levels up from the finest one the first time they are used
+        if resolution not in self.levels:
+            self.levels[resolution] = self.roll_up(
+                self.levels[FINEST_RESOLUTION], resolution
+            )
+        return self.levels[resolution]
+
+    def roll_up(self, finest, resolution, classify=True):
+        # add up the sums and counts of the finest buckets into coarser buckets
+        times = to_buckets(finest.index.get_level_values("time"), resolution)
+        level = (
+            finest[["sum", "count"]]
+            .groupby([times, finest.index.get_level_values("magic")])
+            .sum()
+        )
+        level.index.names = ["time", "magic"]
+        if classify:
+            level["reached_goal"], level["goal_status"] = self.mt5.classify_goals(
+                self.saved_data, level["sum"]
+            )
+        return level
+
+    def fold(self, deals):
+        # add new deals to every level already built
+        new_finest = group_profit(self.mt5, deals)
+        with self.mt5.profiler.span("group"):
+            for resolution, level in self.levels.items():
+                if resolution == FINEST_RESOLUTION:
+                    new_level = new_finest
+                else:
+                    new_level = self.roll_up(new_finest, resolution, classify=False)
+                self.levels[resolution] = self.merge(level, new_level)
+
+    def merge(self, level, new_level):
+        existing = new_level.index.isin(level.index)
+        # add them to the buckets already known and classify only those again
+        updated = new_level.index[existing]
+        if len(updated) > 0:
+            level.loc[updated, ["sum", "count"]] += new_level.loc[
+                updated, ["sum", "count"]
+            ].to_numpy()
+            reached_goal, goal_status = self.mt5.classify_goals(
+                self.saved_data, level.loc[updated, "sum"]
+            )
+            level.loc[updated, "reached_goal"] = reached_goal
+            level.loc[updated, "goal_status"] = goal_status
+        # classify and append the buckets that were not known yet
+        added = new_level[~existing].copy()
+        if len(added) > 0:
+            added["reached_goal"], added["goal_status"] = self.mt5.classify_goals(
+                self.saved_data, added["sum"]
+            )
+            level = pd.concat([level, added]).sort_index()
+        return level
+
+
+def decimate(y, threshold=MAX_PLOT_POINTS):
+    # pick the indices of the lowest and the highest point of equal buckets, so the
+    # peaks of a long line are kept, or all of them for short lines
+    n = len(y)
+    if threshold >= n or threshold < 4:
+        return np.arange(n)
+    # split the points into equal buckets, the last ones filled up past the end
+    buckets = (threshold - 2) // 2
+    size = -(-n // buckets)
+    low = np.full(buckets * size, np.inf)
+    high = np.full(buckets * size, -np.inf)
+    low[:n] = high[:n] = y
+    offsets = np.arange(buckets) * size
+    lows = offsets + low.reshape(buckets, size).argmin(axis=1)
+    highs = offsets + high.reshape(buckets, size).argmax(axis=1)
+    # keep them in the order of the line with the first and the last point
+    indices = np.unique(np.concatenate([[0, n - 1], lows, highs]))
+    return indices[indices < n]
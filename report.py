@@ -0,0 +1,162 @@
+# import the required modules
+import os  # for creating the report directories
+from aggregate import AggregateResult, TABS_LIST  # for the statistics to report
+from metrics import PerformanceMetrics  # for the metrics of the magic numbers
+from trades import build_trades  # for joining the deals into trades
+from live import LiveAggregate  # for grouping the deals a month at a time
+from cache import get_account_key  # for the directory of the account
+
+
+def write_table(data, directory, name, file_format="csv"):
+    path = os.path.join(directory, f"{name}.{file_format}")
+    if file_format == "parquet":
+        # needs pyarrow or fastparquet installed
+        data.to_parquet(path)
+    else:
+        data.to_csv(path)
+    return path
+
+
+def chart_name(i, title):
+    # the file name of the chart of a tab
+    return f"{i}_{title.lower().replace(' ', '_')}"
+
+
+def draw_chart(title, data, get_label):
+    # draw with the Agg canvas directly, so no GUI toolkit is imported
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import matplotlib.dates as mdates
+
+    fig = Figure(figsize=(10, 6), dpi=100)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    data = data.unstack()
+    for magic in data.columns:
+        ax.plot(data.index, data[magic].to_numpy(), label=get_label(magic))
+    ax.legend(title="magic")
+    ax.set_xlabel("time")
+    ax.xaxis.set_major_formatter(mdates.DateFormatter("%Y-%m-%d"))
+    # rotate the x-axis labels for better visibility
+    fig.autofmt_xdate(rotation=45)
+    ax.set_title(title + " by Magic Number")
+    fig.tight_layout()
+    return fig
+
+
+# define a class for writing the statistics to files without a graphical interface
+class Report:
+    def __init__(
+        self,
+        mt5,
+        output_dir="reports",
+        file_format="csv",
+        charts=True,
+        basis="Deals",
+        stream=False,
+    ):
+        self.mt5 = mt5  # the MT5 object for accessing the data
+        self.output_dir = output_dir  # the directory the reports are written to
+        self.file_format = file_format  # "csv" or "parquet" for the tables
+        self.charts = charts  # whether to draw the charts to PNG files
+        self.basis = basis  # whether the deals or the round-trip trades are counted
+        self.stream = stream  # whether the deals are fetched and grouped by month
+
+    def get_directory(self):
+        # write the reports of every account to its own directory
+        account_info = self.mt5.backend.account_info()
+        name = "unknown"
+        if account_info != None:
+            name = get_account_key(account_info.login, account_info.server)
+        directory = os.path.join(self.output_dir, name)
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def get_aggregate(self, saved_data, start_datetime, end_datetime):
+        # fetch and group the deals the same way the GUI does, None if there are none
+        if self.stream:
+            daily, metrics = self.stream_daily(saved_data, start_datetime, end_datetime)
+        else:
+            daily, metrics = self.get_daily(saved_data, start_datetime, end_datetime)
+        if daily is None or len(daily) == 0:
+            return None
+        with self.mt5.profiler.span("stats"):
+            positions = self.mt5.get_positions(start_datetime, daily)
+            aggregate = AggregateResult(
+                TABS_LIST,
+                daily,
+                positions=positions,
+                metrics=metrics.get_table(),
+                curve=metrics.get_curve("Day"),
+            )
+        self.mt5.profiler.count("magics", len(aggregate.magics))
+        return aggregate
+
+    def get_daily(self, saved_data, start_datetime, end_datetime):
+        # group the whole range of deals at once
+        deals = self.mt5.fetch_data(start_datetime, end_datetime)
+        if deals is None:
+            return None, None
+        deals = self.mt5.get_filtered_deals(saved_data, deals)
+        if self.basis == "Trades":
+            with self.mt5.profiler.span("trades"):
+                deals = build_trades(deals)[0]
+        if len(deals) == 0:
+            return None, None
+        metrics = PerformanceMetrics()
+        with self.mt5.profiler.span("metrics"):
+            metrics.fold(deals)
+        filtered_data = self.mt5.group_data_by_time_and_magic(deals)
+        with self.mt5.profiler.span("group"):
+            daily = self.mt5.aggregate_profit(saved_data, filtered_data)
+        return daily, metrics
+
+    def stream_daily(self, saved_data, start_datetime, end_datetime):
+        # group the deals a month at a time, only one month of deals is held at once
+        live_aggregate = LiveAggregate(
+            self.mt5,
+            saved_data,
+            self.mt5.stream_data(start_datetime, end_datetime),
+            start_datetime,
+            end_datetime,
+            self.basis,
+        )
+        with self.mt5.profiler.span("group"):
+            daily = live_aggregate.pyramid.get("Day")
+        return daily, live_aggregate.metrics
+
+    def run(self, saved_data, start_datetime, end_datetime):
+        # write the summary, the daily series and the charts, return the file paths
+        aggregate = self.get_aggregate(saved_data, start_datetime, end_datetime)
+        if aggregate is None:
+            return []
+        directory = self.get_directory()
+        summary = aggregate.magics.copy()
+        summary.insert(
+            0,
+            "label",
+            [self.mt5.get_magic_label(saved_data, m) for m in summary.index],
+        )
+        with self.mt5.profiler.span("write"):
+            paths = [
+                self.write_table(summary, directory, "summary"),
+                self.write_table(aggregate.buckets, directory, "daily"),
+            ]
+        if self.charts:
+            with self.mt5.profiler.span("render"):
+                paths += self.write_charts(aggregate, saved_data, directory)
+        return paths
+
+    def write_table(self, data, directory, name):
+        return write_table(data, directory, name, self.file_format)
+
+    def write_charts(self, aggregate, saved_data, directory):
+        paths = []
+        for i, title, data in aggregate.plot_data:
+            fig = draw_chart(
+                title, data, lambda magic: self.mt5.get_magic_label(saved_data, magic)
+            )
+            path = os.path.join(directory, chart_name(i, title) + ".png")
+            fig.savefig(path)
+            paths.append(path)
+        return paths
@@ -0,0 +1,254 @@
+# import the required modules
+import io  # for rendering the charts in memory
+import json  # for the responses
+import hashlib  # for the entity tags of the responses
+import threading  # for refreshing in the background
+from datetime import datetime  # for the time of the last refresh
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse  # for the path of a request
+from aggregate import AggregateResult, TABS_LIST  # for the statistics served
+from live import LiveAggregate  # for polling only the new deals
+from positions import PositionTracker  # for the open positions of the magics
+from profiling import format_record  # for printing the timings of a refresh
+from report import chart_name, draw_chart  # for the charts of the tabs
+
+# the address the dashboard listens on, only this computer by default
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8050
+# the seconds between two refreshes of the statistics
+REFRESH_SECONDS = 15
+
+
+def get_etag(body):
+    # equal bodies get equal tags, so a viewer can skip what it already has
+    return '"{}"'.format(hashlib.sha1(body).hexdigest())
+
+
+def to_json(data):
+    # the rows of a frame with the index as columns, NaN as null and ISO times
+    return data.reset_index().to_json(orient="records", date_format="iso").encode()
+
+
+# define a class for the statistics shared by every viewer: the terminal is polled
+# once per interval and the responses are built once per refresh
+class Dashboard:
+    def __init__(
+        self,
+        mt5,
+        settings,
+        start_date,
+        basis="Deals",
+        stream=False,
+        charts=True,
+        interval=REFRESH_SECONDS,
+    ):
+        self.mt5 = mt5  # the MT5 object for accessing the data
+        self.settings = settings  # the store of the aliases, goals and states
+        self.start_date = start_date  # the first date of the statistics
+        self.basis = basis  # whether the deals or the round-trip trades are counted
+        self.stream = stream  # whether the deals are fetched and grouped by month
+        self.charts = charts  # whether the charts are served
+        self.interval = interval  # the seconds between the refreshes
+        self.saved_data = None  # the settings the aggregates were built with
+        self.live_aggregate = None  # the aggregates kept up to date by the polls
+        self.position_tracker = PositionTracker(mt5, start_date)
+        # the responses by path, replaced as a whole after every refresh so a
+        # request always sees one consistent refresh
+        self.resources = {}
+        self.rendered = {}  # the chart images already drawn, by their tag
+        self.updated = None  # the time the statistics were built
+        self.stale = False  # whether the terminal is disconnected
+        self.lock = threading.Lock()  # only one thread draws the charts at once
+        self.stopped = threading.Event()
+
+    def refresh(self):
+        # poll the terminal and rebuild the responses if anything changed
+        is_connected, connection_string = self.mt5.connection.get_connection()
+        if not is_connected:
+            # keep serving the last statistics, marked as stale, while the terminal
+            # is reconnected in the background
+            if not self.stale:
+                print(connection_string)
+                self.stale = True
+                self.publish_index(connection_string)
+            return False
+        was_stale, self.stale = self.stale, False
+        end_datetime = datetime.now()
+        saved_data = self.settings.load()
+        if (
+            self.live_aggregate is None
+            or self.live_aggregate.last_time is None
+            or saved_data is not self.saved_data
+        ):
+            # group the whole range again the first time or when the settings changed
+            if self.stream:
+                deals = self.mt5.stream_data(self.start_date, end_datetime)
+            else:
+                deals = self.mt5.fetch_data(self.start_date, end_datetime)
+            self.live_aggregate = LiveAggregate(
+                self.mt5,
+                saved_data,
+                deals,
+                self.start_date,
+                None,
+                self.basis,
+            )
+            self.saved_data = saved_data
+            changed = True
+        else:
+            changed = self.live_aggregate.poll(end_datetime)
+        changed = self.position_tracker.poll() or changed
+        if changed or not self.resources:
+            with self.mt5.profiler.span("stats"):
+                self.publish(connection_string)
+        elif was_stale:
+            self.publish_index(connection_string)
+        return changed
+
+    def publish(self, connection_string):
+        # build every response of the new statistics
+        live_aggregate = self.live_aggregate
+        daily = live_aggregate.pyramid.get("Day")
+        aggregate = AggregateResult(
+            TABS_LIST,
+            daily,
+            positions=self.position_tracker.totals,
+            metrics=live_aggregate.metrics.get_table(),
+            curve=live_aggregate.metrics.get_curve("Day"),
+        )
+        self.mt5.profiler.count("magics", len(aggregate.magics))
+        summary = aggregate.magics.copy()
+        summary.insert(0, "label", [self.get_label(m) for m in summary.index])
+        resources = {
+            "/summary.json": to_json(summary),
+            "/daily.json": to_json(aggregate.buckets),
+            "/goals.json": to_json(self.get_goals(aggregate.buckets)),
+        }
+        resources = {
+            path: ("application/json", get_etag(body), body)
+            for path, body in resources.items()
+        }
+        if self.charts:
+            for i, title, data in aggregate.plot_data:
+                # the chart is drawn on its first request, tagged by what it shows
+                labels = [self.get_label(m) for m in data.index.unique("magic")]
+                tag = to_json(data.to_frame()) + json.dumps([title, labels]).encode()
+                resources[f"/charts/{chart_name(i, title)}.png"] = (
+                    "image/png",
+                    get_etag(tag),
+                    (title, data),
+                )
+        # forget the charts no longer served
+        tags = {etag for _, etag, _ in resources.values()}
+        with self.lock:
+            self.rendered = {
+                etag: image for etag, image in self.rendered.items() if etag in tags
+            }
+        self.updated = datetime.now().isoformat(timespec="seconds")
+        self.resources = resources
+        self.publish_index(connection_string)
+
+    def publish_index(self, connection_string):
+        # list the responses with the time of the statistics and whether they are
+        # stale because the terminal is disconnected
+        index = {
+            "title": connection_string,
+            "updated": self.updated,
+            "stale": self.stale,
+            "basis": self.basis,
+            "resources": sorted(path for path in self.resources if path != "/"),
+        }
+        body = json.dumps(index).encode()
+        self.resources = {
+            **self.resources,
+            "/": ("application/json", get_etag(body), body),
+        }
+
+    def get_label(self, magic):
+        return str(self.mt5.get_magic_label(self.saved_data, magic))
+
+    def get_goals(self, buckets):
+        # the goals of every magic number and where its last day stands against them
+        last_day = buckets.groupby(level="magic").tail(1).reset_index("time")
+        profit_goal, loss_goal = self.mt5.get_goal_thresholds(
+            self.saved_data or {}, last_day.index
+        )
+        return last_day[["time", "sum", "reached_goal", "goal_status"]].assign(
+            profit_goal=profit_goal, loss_goal=loss_goal
+        )
+
+    def get_body(self, resource):
+        # the body of a response, drawing a chart the first time it is asked for
+        content_type, etag, body = resource
+        if isinstance(body, bytes):
+            return body
+        with self.lock:
+            if etag not in self.rendered:
+                title, data = body
+                image = io.BytesIO()
+                draw_chart(title, data, self.get_label).savefig(image, format="png")
+                self.rendered[etag] = image.getvalue()
+            return self.rendered[etag]
+
+    def run(self):
+        # refresh on a schedule until stopped, a failed refresh is tried again later
+        while not self.stopped.is_set():
+            self.mt5.profiler.start()
+            changed = False
+            try:
+                changed = self.refresh()
+            except Exception as e:
+                print("refresh failed: {}".format(e))
+            record = self.mt5.profiler.finish()
+            if changed:
+                print(format_record(record))
+            self.stopped.wait(self.interval)
+
+
+# define a class for answering the requests of the viewers from the shared responses
+class DashboardHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        dashboard = self.server.dashboard
+        resource = dashboard.resources.get(urlparse(self.path).path)
+        if resource is None:
+            self.send_error(404)
+            return
+        content_type, etag, _ = resource
+        # a viewer that already has this version only gets the tag back
+        tags = self.headers.get("If-None-Match", "").split(",")
+        if etag in [tag.strip() for tag in tags]:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_stale_header(dashboard)
+            self.end_headers()
+            return
+        body = dashboard.get_body(resource)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_stale_header(dashboard)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_stale_header(self, dashboard):
+        # tell the viewers the statistics are not being updated
+        if dashboard.stale:
+            self.send_header("X-Stale", "true")
+
+
+def serve(dashboard, host=SERVER_HOST, port=SERVER_PORT):
+    # refresh in the background and answer the viewers, each request on a thread
+    server = ThreadingHTTPServer((host, port), DashboardHandler)
+    server.dashboard = dashboard
+    refresher = threading.Thread(target=dashboard.run, daemon=True)
+    refresher.start()
+    print("serving on http://{}:{}/".format(*server.server_address[:2]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dashboard.stopped.set()
+        server.server_close()
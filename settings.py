@@ -0,0 +1,113 @@
+# import the required modules
+import ast  # for reading the old data.txt files without running them
+import json  # for storing the settings
+import os  # for checking the file times and replacing the file atomically
+import numpy as np  # for the typed arrays of the settings
+
+# the file the settings are stored in, and the file of the older versions
+SETTINGS_FILE = "settings.json"
+LEGACY_FILE = "data.txt"
+
+
+def to_goal(value):
+    # the goals are typed as numbers, empty or invalid goals are None
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_entry(magic_data):
+    # the alias, goals and state of a magic number with their types
+    return {
+        "alias": str(magic_data.get("alias", "") or ""),
+        "profit": to_goal(magic_data.get("profit")),
+        "loss": to_goal(magic_data.get("loss")),
+        "state": int(magic_data.get("state", 1) or 0),
+    }
+
+
+# define a class for the settings of every magic number by its number as a string,
+# with the goals and states also kept as arrays sorted by magic number
+class Settings(dict):
+    def __init__(self, data=None):
+        super().__init__(
+            (str(magic), to_entry(magic_data))
+            for magic, magic_data in (data or {}).items()
+        )
+        magics = np.array([int(magic) for magic in self], dtype="int64")
+        order = np.argsort(magics)
+        entries = [self[str(magic)] for magic in magics[order]]
+        self.magics = magics[order]
+        # the missing goals are 0, like the empty goals always were
+        self.profit_goals = np.array(
+            [entry["profit"] or 0 for entry in entries], dtype="float64"
+        )
+        self.loss_goals = np.array(
+            [entry["loss"] or 0 for entry in entries], dtype="float64"
+        )
+        self.states = np.array([entry["state"] for entry in entries], dtype="int64")
+
+    @classmethod
+    def of(cls, data):
+        # use the settings as they are, or type a plain dictionary
+        return data if isinstance(data, cls) else cls(data)
+
+    def goal_thresholds(self, magics):
+        # look up the profit and loss goals of every row by its magic number
+        magics = np.asarray(magics, dtype="int64")
+        if len(self.magics) == 0:
+            return np.zeros(len(magics)), np.zeros(len(magics))
+        positions = np.searchsorted(self.magics, magics).clip(0, len(self.magics) - 1)
+        found = self.magics[positions] == magics
+        profit_goals = np.where(found, self.profit_goals[positions], 0)
+        loss_goals = np.where(found, self.loss_goals[positions], 0)
+        return profit_goals, loss_goals
+
+    def disabled_magics(self):
+        # the magic numbers hidden in the Edit Filters window
+        return self.magics[self.states != 1]
+
+
+# define a class for reading and writing the settings file
+class SettingsStore:
+    def __init__(self, path=SETTINGS_FILE, legacy_path=LEGACY_FILE):
+        self.path = path  # the settings file
+        self.legacy_path = legacy_path  # the data.txt file of the older versions
+        self.settings = None  # the settings read last
+        self.mtime = None  # the modification time of the file read last
+
+    def load(self):
+        # read the settings, only parsing the file again when it changed
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return self.migrate()
+        if mtime != self.mtime:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.settings = Settings(json.load(f))
+            self.mtime = mtime
+        return self.settings
+
+    def migrate(self):
+        # move the settings of a data.txt file to the settings file
+        try:
+            with open(self.legacy_path, "r") as f:
+                data = ast.literal_eval(f.read())
+        except FileNotFoundError:
+            return None
+        return self.save(data)
+
+    def save(self, data):
+        # write the settings to a temporary file and replace the old one with it,
+        # so a crash never leaves a half written file
+        settings = Settings.of(data)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(settings, f, indent=2)
+        os.replace(temp_path, self.path)
+        self.settings = settings
+        self.mtime = os.stat(self.path).st_mtime_ns
+        return settings
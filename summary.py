@@ -0,0 +1,160 @@
+# import the required modules
+import numpy as np  # for sorting the rows by the precomputed keys
+import matplotlib.colors as mcolors  # for the colors of the rows
+
+# the columns of the summary table, their headings and the aggregate columns
+# their values and sort keys come from
+SUMMARY_COLUMNS = {
+    "Magic Number": ("Magic Number", None),
+    "Mean Daily Profit": ("Mean Daily Profit", "mean_profit"),
+    "Total Profit": ("Profit", "total_profit"),
+    "Opened Positions": ("Positions", "positions"),
+    "Volume": ("Volume", "volume"),
+    "Floating Profit": ("Floating Profit", "floating_profit"),
+    "Swap": ("Swap", "swap"),
+    "Trades": ("Trades", "trades"),
+    "Win Rate": ("Win Rate", "win_rate"),
+    "Profit Factor": ("Profit Factor", "profit_factor"),
+    "Avg Win": ("Avg Win", "avg_win"),
+    "Avg Loss": ("Avg Loss", "avg_loss"),
+    "Max Drawdown": ("Max Drawdown", "max_drawdown"),
+    "Sharpe": ("Sharpe", "sharpe"),
+}
+
+
+def to_text(values, text="{:.2f}"):
+    # show the metrics rounded, and empty where they are not defined
+    return ["" if np.isnan(value) else text.format(value) for value in values.tolist()]
+
+
+def summary_rows(aggregate, labels):
+    # get the values of every row of the summary table by its item id,
+    # in the order of the magic numbers
+    magics = aggregate.magics
+    return {
+        str(magic): (labels[magic], *values)
+        for magic, *values in zip(
+            magics.index.tolist(),
+            magics["mean_profit"].tolist(),
+            magics["total_profit"].tolist(),
+            magics["positions"].astype("int64").tolist(),
+            magics["volume"].round(2).tolist(),
+            magics["floating_profit"].round(2).tolist(),
+            magics["swap"].round(2).tolist(),
+            magics["trades"].tolist(),
+            to_text(magics["win_rate"] * 100, "{:.1f}%"),
+            to_text(magics["profit_factor"]),
+            to_text(magics["avg_win"]),
+            to_text(magics["avg_loss"]),
+            to_text(magics["max_drawdown"]),
+            to_text(magics["sharpe"]),
+        )
+    }
+
+
+def summary_keys(aggregate):
+    # get the keys the rows are sorted by for every column, so sorting does not
+    # read the values back from the table
+    magics = aggregate.magics
+    keys = {}
+    for column, (heading, field) in SUMMARY_COLUMNS.items():
+        keys[column] = magics.index.to_numpy() if field is None else magics[field]
+        keys[column] = np.asarray(keys[column])
+    return magics.index.astype(str).to_numpy(), keys
+
+
+# define a class for showing the totals of the magic numbers in a treeview,
+# touching only the rows that changed since the last refresh
+class SummaryTable:
+    def __init__(self, treeview):
+        self.treeview = treeview  # the treeview widget showing the rows
+        self.rows = {}  # the values shown in every row by its item id
+        self.colors = {}  # the background color of every row by its item id
+        self.order = []  # the item ids in the order they are shown
+        self.iids = np.array([], dtype=str)  # the item ids of the sort keys
+        self.keys = {}  # the sort keys of every column
+        self.sort_column = None  # the column the rows are sorted by
+        self.sort_descending = False  # whether the sort is descending
+
+    def create(self):
+        self.treeview["columns"] = tuple(SUMMARY_COLUMNS)
+
+        # format column headings
+        self.treeview.column("#0", width=0, stretch=False)
+        for column in SUMMARY_COLUMNS:
+            self.treeview.column(column, anchor="center", width=100)
+
+        self.treeview.heading("#0", text="", anchor="center")
+        for column in SUMMARY_COLUMNS:
+            # sort the rows by the column when its heading is clicked
+            self.treeview.heading(
+                column, anchor="center", command=lambda c=column: self.sort_by(c)
+            )
+        self.update_headings()
+
+    def update(self, aggregate, labels, magic_colors):
+        rows = summary_rows(aggregate, labels)
+        self.iids, self.keys = summary_keys(aggregate)
+        # remove the rows of the magic numbers that are not shown anymore
+        removed = [iid for iid in self.rows if iid not in rows]
+        if removed:
+            self.treeview.delete(*removed)
+            for iid in removed:
+                del self.rows[iid]
+                del self.colors[iid]
+        for magic, color in magic_colors.items():
+            iid = str(magic)
+            color = mcolors.to_hex(color)
+            # configure the tag of the row to match the chart color
+            if self.colors.get(iid) != color:
+                self.treeview.tag_configure(f"magic_{iid}", background=color)
+                self.colors[iid] = color
+        # update the rows that changed and add the new ones at the end
+        self.order = [iid for iid in self.order if iid in rows]
+        for iid, values in rows.items():
+            if iid not in self.rows:
+                self.treeview.insert(
+                    "", "end", iid=iid, values=values, tags=[f"magic_{iid}"]
+                )
+                self.order.append(iid)
+            elif self.rows[iid] != values:
+                self.treeview.item(iid, values=values)
+        self.rows = rows
+        self.apply_order()
+
+    def apply_order(self):
+        # move the rows only when the order changed
+        if self.sort_column is None:
+            order = self.iids.tolist()
+        else:
+            # a stable sort keeps the order of the magic numbers between equal keys
+            indices = np.argsort(self.keys[self.sort_column], kind="stable")
+            if self.sort_descending:
+                indices = indices[::-1]
+            order = self.iids[indices].tolist()
+        if order != self.order:
+            for index, iid in enumerate(order):
+                self.treeview.move(iid, "", index)
+            self.order = order
+
+    def sort_by(self, column):
+        # sort by the clicked column, clicking it again reverses the order
+        if self.sort_column == column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column, self.sort_descending = column, False
+        self.update_headings()
+        self.apply_order()
+
+    def update_headings(self):
+        # mark the sorted column with an arrow
+        for column, (heading, field) in SUMMARY_COLUMNS.items():
+            if column == self.sort_column:
+                heading += " ▼" if self.sort_descending else " ▲"
+            self.treeview.heading(column, text=heading)
+
+    def clear(self):
+        if self.rows:
+            self.treeview.delete(*self.rows)
+        self.rows, self.colors, self.order = {}, {}, []
+        self.iids, self.keys = np.array([], dtype=str), {}
@@ -0,0 +1,85 @@
+# import the required modules
+import numpy as np  # for the calculations over the positions
+import pandas as pd  # for data manipulation and analysis
+from cache import concat  # for joining the waiting deals with the new ones
+
+# the bases the statistics can be calculated on
+BASES = ["Deals", "Trades"]
+# the money fields added up into the net result of a trade
+NET_FIELDS = ["profit", "commission", "swap", "fee"]
+
+
+def build_trades(deals):
+    # join the deals of every position into one round-trip trade, sorted once by
+    # position and time, returning the trades and the deals of the positions that
+    # are still open
+    deals = deals[(deals["type"].to_numpy() <= 1) & (deals["position_id"] != 0)]
+    position = deals["position_id"].to_numpy()
+    order = np.lexsort((deals["ticket"].to_numpy(), deals["time"].to_numpy(), position))
+    position = position[order]
+    time = deals["time"].to_numpy()[order]
+    entry = deals["entry"].to_numpy()[order]
+    volume = deals["volume"].to_numpy(dtype="float64")[order]
+    net = np.zeros(len(deals))
+    for field in NET_FIELDS:
+        if field in deals:
+            net += deals[field].to_numpy(dtype="float64")[order]
+    positions, starts = np.unique(position, return_index=True)
+    if len(positions) == 0:
+        return empty_trades(), deals.iloc[:0]
+    ends = np.append(starts[1:], len(position)) - 1
+    # the volume opened and closed in every position, the in deals have entry 0
+    opening = entry == 0
+    opened = np.add.reduceat(np.where(opening, volume, 0), starts)
+    closed = np.add.reduceat(np.where(opening, 0, volume), starts)
+    # a trade is complete once its closing deals cover the opened volume, the
+    # positions opened before the first fetched deal only have closing deals
+    complete = (closed > 0) & (closed >= opened - 1e-9)
+    trades = pd.DataFrame(
+        {
+            "position_id": positions,
+            "magic": deals["magic"].to_numpy()[order][starts],
+            "open_time": time[starts],
+            "time": time[ends],
+            "duration": time[ends] - time[starts],
+            "volume": np.maximum(opened, closed),
+            "profit": np.add.reduceat(net, starts),
+            "deals": np.diff(np.append(starts, len(position))),
+        }
+    )
+    if "symbol" in deals:
+        trades["symbol"] = deals["symbol"].to_numpy()[order][starts]
+    trades = trades[complete]
+    # keep the deals of the open positions until they are closed
+    waiting = np.repeat(~complete, np.diff(np.append(starts, len(position))))
+    pending = deals.iloc[order[waiting]]
+    return trades.sort_values("time", kind="stable", ignore_index=True), pending
+
+
+def empty_trades():
+    return pd.DataFrame(
+        {
+            "position_id": pd.Series(dtype="int64"),
+            "magic": pd.Series(dtype="int64"),
+            "open_time": pd.Series(dtype="int64"),
+            "time": pd.Series(dtype="int64"),
+            "duration": pd.Series(dtype="int64"),
+            "volume": pd.Series(dtype="float64"),
+            "profit": pd.Series(dtype="float64"),
+            "deals": pd.Series(dtype="int64"),
+        }
+    )
+
+
+# define a class for turning the deals into trades as they arrive, keeping the
+# deals of the open positions until the positions are closed
+class TradeBuilder:
+    def __init__(self):
+        self.pending = None  # the deals of the positions still open
+
+    def fold(self, deals):
+        # get the trades completed by the new deals
+        if self.pending is not None and len(self.pending) > 0:
+            deals = concat([self.pending, deals])
+        trades, self.pending = build_trades(deals)
+        return trades